@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+from createics.backfill import run_backfill
+from createics.sources.checkins import ClubVisitsSource
+import argparse
+import logging
+import os
+import sys
+
+
+def main():
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+
+    parser = argparse.ArgumentParser(
+        description="Download and convert club visits reports for every"
+        " month in a date range.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("start_date", metavar="START_DATE")
+    parser.add_argument("end_date", metavar="END_DATE")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        default=os.path.join(script_dir, "24hr-checkins"),
+        help="Directory holding the pdf reports and calendars",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of pdf conversion processes",
+    )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        default=2,
+        help="Number of reports downloaded in parallel",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["auto", "http", "chrome"],
+        default="auto",
+        help="Fetch reports over http, with chrome, or over http falling"
+        " back to chrome",
+    )
+    parser.add_argument(
+        "--pdf-backend",
+        choices=ClubVisitsSource.backends,
+        default="tabula",
+        help="Library used to extract the checkin table",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10,
+        help="Seconds to wait for each pdf download",
+    )
+    parser.add_argument(
+        "--headless", action="store_true", help="Run in headless mode"
+    )
+    parser.add_argument("-d", "--debug", action="store_true")
+    args = parser.parse_args()
+
+    level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
+
+    from dateparser import parse
+
+    start_date = parse(args.start_date).date()
+    end_date = parse(args.end_date).date()
+    if start_date > end_date:
+        parser.error("START_DATE is after END_DATE")
+
+    results = run_backfill(
+        os.path.join(script_dir, "config.toml"),
+        start_date,
+        end_date,
+        args.output_dir,
+        workers=args.jobs,
+        sessions=args.sessions,
+        pdf_backend=args.pdf_backend,
+        backend=args.backend,
+        timeout=args.timeout,
+        headless=args.headless,
+    )
+
+    failed = 0
+    for (window_start, window_end), ics_file in sorted(results.items()):
+        if ics_file is None:
+            failed += 1
+            print(f"{window_start} - {window_end}: failed")
+        else:
+            print(f"{window_start} - {window_end}: {ics_file}")
+
+    print(f"Backfilled {len(results) - failed} of {len(results)} months.")
+    if failed:
+        print("Run again with the same range to retry the failed months.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+from createics.batch import expand_inputs, read_manifest, run_batch
+from createics.metrics import add_metrics_arguments, metrics_from_args
+from createics.pipeline import add_event_cache_argument
+from createics.sources import SOURCES
+import argparse
+import logging
+import os
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create calendars for many schedules at once.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        metavar="INPUT",
+        help="Input files or glob patterns",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        help='File of "SOURCE INPUT [OUTPUT]" lines',
+    )
+    parser.add_argument(
+        "-s",
+        "--source",
+        default="athletics",
+        choices=sorted(SOURCES),
+        help="Source type of the INPUT files",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Only rewrite new, changed or cancelled events",
+    )
+    parser.add_argument(
+        "--fast-html",
+        action="store_true",
+        help="Parse only the needed parts of the page with lxml",
+    )
+    parser.add_argument(
+        "-d", "--debug", action="store_true", help="Enable debugging"
+    )
+    add_event_cache_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    if not (args.inputs or args.manifest):
+        parser.error("no INPUT files or --manifest given")
+
+    level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
+
+    jobs = expand_inputs(args.inputs, args.source)
+    if args.manifest:
+        jobs.extend(read_manifest(args.manifest))
+
+    metrics = metrics_from_args(args, "batch-ics")
+    # stage times are summed over the worker processes
+    results = run_batch(
+        jobs,
+        args.jobs,
+        args.incremental,
+        fast_html=args.fast_html,
+        metrics=metrics,
+        cache_events=args.event_cache,
+    )
+
+    failed = 0
+    for (source_name, input_file, ics_file), count, error in results:
+        if error is None:
+            print(f"{ics_file}: {count} events")
+        else:
+            failed += 1
+
+    print(f"Built {len(results) - failed} of {len(results)} calendars.")
+    metrics.count("calendars", len(results) - failed)
+    metrics.count("calendars_failed", failed)
+    if args.metrics:
+        metrics.write(args.metrics, args.metrics_format)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+#!/usr/bin/python3
+
+from contextlib import redirect_stdout
+from createics.eventcache import EventCache
+from createics.geocache import (
+    CachedGeocoder,
+    GeocodeCache,
+    StubGeolocator,
+)
+from createics.icswriter import IcsWriter
+from createics.pipeline import Pipeline, change_ext
+from createics.sources import get_source
+from datetime import datetime, timedelta
+import argparse
+import io
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+
+STAGES = ["extract", "dates", "geocode", "build", "serialize"]
+
+SCRIPT_SOURCES = {
+    "bball-sched.py": "athletics",
+    "schedule.py": "varsity",
+    "create-ics.py": "maxpreps",
+    "club-visits-cal.py": "club-visits",
+    "gym-calendar.py": "gym-checkins",
+}
+
+STARTUP_SCRIPTS = [
+    "bball-sched.py",
+    "create-ics.py",
+    "schedule.py",
+    "club-visits-cal.py",
+    "gym-calendar.py",
+    "batch-ics.py",
+    "merge-club-visits.py",
+    "download-pdf.py",
+    "backfill-club-visits.py",
+    "serve-ics.py",
+]
+
+IMPORT_TIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+VENUES = [f"{n} Main Street, New York, NY" for n in range(1, 21)]
+
+
+class StageTimes(dict):
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self[stage] = (
+                    self.get(stage, 0.0) + time.perf_counter() - start
+                )
+
+        return timed
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), statistics.mean(times), peak
+
+
+def print_header(title):
+    print(title)
+    print(f"{'':32} {'best ms':>10} {'mean ms':>10} {'peak KiB':>10}")
+
+
+def print_row(label, best, mean, peak):
+    print(
+        f"{label:32} {best * 1000:10.2f} {mean * 1000:10.2f}"
+        f" {peak / 1024:10.0f}"
+    )
+
+
+def bench_parse(args):
+    from createics.htmlparse import html_features
+
+    source_class = get_source(args.source)
+    print_header(f"Parsing {args.html_file} ({args.source})")
+
+    games = {}
+    for label, fast_html in [
+        ("html.parser, full tree", False),
+        (f"{html_features()}, fast path", True),
+    ]:
+        source = source_class(args.html_file, fast_html=fast_html)
+        print_row(label, *measure(source.load, args.repeat))
+        games[fast_html] = source.games
+
+    if games[False] != games[True]:
+        print("WARNING: fast parser found different games")
+
+
+def bench_pdf(args):
+    source_class = get_source("club-visits")
+    print_header(f"Extracting {args.pdf_file}")
+
+    frames = {}
+    for backend in args.backends:
+        source = source_class(args.pdf_file, backend)
+        try:
+            result = measure(source.load, args.repeat)
+        except Exception as e:
+            print(f"{backend:32} failed: {e}")
+            continue
+        print_row(backend, *result)
+        frames[backend] = source.frame()
+
+    if len(frames) > 1:
+        first, *others = frames.values()
+        if not all(first.equals(other) for other in others):
+            print("WARNING: backends extracted different rows")
+
+
+def import_times(command):
+    """Run command under -X importtime.
+
+    Returns the wall time, the total import time and the cumulative
+    import time of each top-level module, all in seconds.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        # top-level imports are indented by a single space
+        if match and len(match.group(3)) == 1:
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+    return wall, sum(modules.values()), modules
+
+
+def bench_startup(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # club-visits-cal.py exits early when the calendar exists
+        pdf_file = os.path.join(tmpdir, "Club-Visits.pdf")
+        for path in (pdf_file, change_ext(pdf_file, ".ics")):
+            open(path, "w").close()
+
+        commands = [
+            (f"{script} --help", [script, "--help"])
+            for script in args.scripts
+        ]
+        commands.append(
+            ("club-visits-cal.py (exists)", ["club-visits-cal.py", pdf_file])
+        )
+
+        print(
+            f"{'':32} {'wall ms':>10} {'import ms':>10}"
+            f"  heaviest top-level imports"
+        )
+        for label, (script, *script_args) in commands:
+            command = [os.path.join(SCRIPT_DIR, script), *script_args]
+            runs = [import_times(command) for _ in range(args.repeat)]
+            wall = min(run[0] for run in runs)
+            _, imports, modules = min(runs, key=lambda run: run[1])
+            heaviest = sorted(modules, key=modules.get, reverse=True)[:3]
+            print(
+                f"{label:32} {wall * 1000:10.2f} {imports * 1000:10.2f}  "
+                + ", ".join(
+                    f"{name} {modules[name] * 1000:.1f}" for name in heaviest
+                )
+            )
+
+
+def synthetic_athletics(path, rows):
+    trs = []
+    for i in range(rows):
+        # keep every game within one season
+        day = datetime(2024, 11, 1) + timedelta(days=i % 120)
+        if i % 2:
+            venue = VENUES[i % len(VENUES)]
+            query = venue.replace(" ", "+")
+            location = (
+                f'<a href="https://maps.google.com/?q={query}">{venue}</a>'
+            )
+        else:
+            location = "Marc A. Zambetti Center"
+        trs.append(
+            f"<tr><td>{day:%a}</td><td>{day:%b} {day.day}</td>"
+            f"<td>4:30 PM</td><td>{location}</td><td>Game</td>"
+            f"<td>Opponent {i % 30}</td></tr>"
+        )
+    with open(path, "w") as fh:
+        fh.write(
+            '<html><head><meta property="og:site_name"'
+            ' content="Riverdale Country School"></head><body>'
+            '<span class="site-nav-address--title">Middle &amp; Upper'
+            " School</span><p>\n5250 Fieldston Rd\nBronx, NY 10471</p>"
+            '<table class="athletics-event-table"><tbody>'
+            + "\n".join(trs)
+            + "</tbody></table></body></html>"
+        )
+    return get_source("athletics")(path, today=datetime(2024, 10, 1))
+
+
+def synthetic_varsity(path, rows):
+    trs = []
+    for i in range(rows):
+        day = datetime(2024, 11, 1) + timedelta(days=i % 120)
+        if i % 2:
+            venue = VENUES[i % len(VENUES)]
+            query = venue.replace(" ", "+")
+            location = (
+                f'<a href="https://maps.google.com/?q={query}">{venue}</a>'
+            )
+        else:
+            location = "Marc A. Zambetti Center"
+        trs.append(
+            f"<tr><td>{day:%a}</td><td>{day:%b} {day.day}</td>"
+            f"<td>4:30 PM</td><td>{location}</td><td>Game</td>"
+            f"<td>Opponent {i % 30}</td></tr>"
+        )
+    with open(path, "w") as fh:
+        fh.write(
+            '<html><head><meta property="og:site_name"'
+            ' content="Riverdale Country School"></head><body>'
+            "<table><tbody>" + "\n".join(trs) + "</tbody></table>"
+            "</body></html>"
+        )
+    return get_source("varsity")(path, today=datetime(2024, 10, 1))
+
+
+def synthetic_maxpreps(path, rows, template=None):
+    template = template or os.path.join(SCRIPT_DIR, "schedule.html")
+    with open(template) as fh:
+        page = fh.read()
+    start = page.index("<tbody>", page.index('<table id="schedule"')) + 7
+    end = page.index("</tbody>", start)
+    template_rows = re.findall(r"<tr.*?</tr>", page[start:end], re.S)
+
+    trs = []
+    for i in range(rows):
+        tr = template_rows[i % len(template_rows)]
+        day = datetime(2022, 12, 1) + timedelta(days=i)
+        trs.append(
+            re.sub(
+                r'title="[\d-]+T',
+                f'title="{day:%Y-%m-%d}T',
+                tr,
+                count=1,
+            )
+        )
+
+    with open(path, "w") as fh:
+        fh.write(page[:start] + "\n".join(trs) + page[end:])
+    return get_source("maxpreps")(path)
+
+
+def synthetic_gym(path, rows):
+    with open(path, "w") as fh:
+        for i in range(rows):
+            # oldest first and within the year given on the command line
+            minutes = i * (365 * 24 * 60 - 1) // rows
+            day = datetime(2023, 1, 1) + timedelta(minutes=minutes)
+            fh.write(f"{day.month}/{day.day}\n")
+            fh.write(f"{day:%I}:{day:%M%p}\n".lstrip("0").lower())
+    return get_source("gym-checkins")(path, 2023, "24 Hour Fitness")
+
+
+def synthetic_club_visits(path, rows, page_rows=40):
+    import pandas as pd
+
+    checkins = []
+    day = datetime(2020, 1, 1, 6, 0)
+    for i in range(rows):
+        day += timedelta(hours=19 + i % 11)
+        club = "Manhattan 23rd St SS" if i % 3 else "Midtown\rSport"
+        checkins.append(
+            [f"{day:%m/%d/%Y %I:%M %p}", club, VENUES[i % len(VENUES)]]
+        )
+
+    # tabula returns one DataFrame per page, newest check-in first
+    checkins.reverse()
+    tables = [
+        pd.DataFrame(checkins[i : i + page_rows])
+        for i in range(0, len(checkins), page_rows)
+    ]
+
+    source = get_source("club-visits")(path)
+    source.load = lambda: setattr(source, "tables", tables)
+    return source
+
+
+SYNTHETIC = {
+    "athletics": (synthetic_athletics, ".html"),
+    "varsity": (synthetic_varsity, ".html"),
+    "maxpreps": (synthetic_maxpreps, ".html"),
+    "gym-checkins": (synthetic_gym, ".txt"),
+    "club-visits": (synthetic_club_visits, ".pdf"),
+}
+
+
+def run_stages(source, times):
+    geolocator = StubGeolocator()
+    geocoder = CachedGeocoder(
+        GeocodeCache(":memory:"), lambda: geolocator, rate_limit=0
+    )
+    geocoder.geocode = times.wrap("geocode", geocoder.geocode)
+    geocoder.geocode_many = times.wrap("geocode", geocoder.geocode_many)
+    pipeline = Pipeline(geocoder)
+    for name in ("start_time", "start_times"):
+        if hasattr(source, name):
+            setattr(source, name, times.wrap("dates", getattr(source, name)))
+
+    with redirect_stdout(io.StringIO()):
+        times.wrap("extract", source.load)()
+        events = times.wrap("build", list)(source.events(pipeline))
+
+    times["build"] -= times.get("dates", 0.0) + times.get("geocode", 0.0)
+
+    def serialize(event_cache=None):
+        with IcsWriter(
+            io.BytesIO(), source.prodid, event_cache=event_cache
+        ) as cal:
+            for event in events:
+                cal.write_event(**event.fields())
+
+    times.wrap("serialize", serialize)()
+
+    # a rerun with every event already in an event cache file,
+    # including the time to load and save it
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_file = os.path.join(tmpdir, "events.sqlite")
+        event_cache = EventCache("benchmark.ics", cache_file)
+        serialize(event_cache)
+        event_cache.save()
+        event_cache.close()
+
+        def rewrite():
+            event_cache = EventCache("benchmark.ics", cache_file)
+            try:
+                serialize(event_cache)
+                event_cache.save()
+            finally:
+                event_cache.close()
+
+        times.wrap("rewrite", rewrite)()
+    return events
+
+
+def bench_pipeline(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for source_name in args.sources:
+            make_source, ext = SYNTHETIC[source_name]
+            script = next(
+                k for k, v in SCRIPT_SOURCES.items() if v == source_name
+            )
+            for rows in args.rows:
+                path = os.path.join(tmpdir, f"{source_name}-{rows}{ext}")
+                source = make_source(path, rows)
+                times = StageTimes()
+                events = run_stages(source, times)
+
+                tracemalloc.start()
+                run_stages(make_source(path, rows), StageTimes())
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                total = sum(times.get(stage, 0.0) for stage in STAGES)
+                print(
+                    f"{script} ({source_name}): {rows} rows,"
+                    f" {len(events)} events, peak {peak / 1024:.0f} KiB"
+                )
+                if source_name == "club-visits":
+                    print("  (tables synthesized, use --pdf to time tabula)")
+                for stage in STAGES:
+                    elapsed = times.get(stage, 0.0)
+                    rate = rows / elapsed if elapsed else float("inf")
+                    print(
+                        f"  {stage:10} {elapsed * 1000:10.2f} ms"
+                        f" {rate:12.0f} rows/s"
+                    )
+                print(
+                    f"  {'total':10} {total * 1000:10.2f} ms"
+                    f" {rows / total:12.0f} rows/s"
+                )
+                rewrite = times["rewrite"]
+                print(
+                    f"  {'rewrite':10} {rewrite * 1000:10.2f} ms"
+                    f" {rows / rewrite:12.0f} rows/s (cached events)"
+                )
+
+        if args.pdf:
+            source = get_source("club-visits")(args.pdf)
+            times = StageTimes()
+            events = run_stages(source, times)
+            print(f"club-visits-cal.py ({args.pdf}): {len(events)} events")
+            for stage in STAGES:
+                print(f"  {stage:10} {times.get(stage, 0.0) * 1000:10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the calendar pipeline.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        type=int,
+        default=20,
+        help="Number of timed runs per measurement",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser(
+        "parse", help="Compare full and fast html parsing"
+    )
+    parse_parser.add_argument(
+        "html_file",
+        nargs="?",
+        default="schedule.html",
+        help="Input schedule html file",
+    )
+    parse_parser.add_argument(
+        "-s",
+        "--source",
+        default="maxpreps",
+        help="Source type of html_file",
+    )
+    parse_parser.set_defaults(func=bench_parse)
+
+    pdf_parser = subparsers.add_parser(
+        "pdf", help="Compare Club Visits pdf extraction backends"
+    )
+    pdf_parser.add_argument("pdf_file", help="Club Visits pdf report")
+    pdf_parser.add_argument(
+        "-b",
+        "--backends",
+        nargs="+",
+        default=["tabula", "pdfplumber"],
+        help="Extraction backends to compare",
+    )
+    pdf_parser.set_defaults(func=bench_pdf)
+
+    pipeline_parser = subparsers.add_parser(
+        "pipeline",
+        help="Time each stage of every script on synthetic inputs",
+    )
+    pipeline_parser.add_argument(
+        "-r",
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="Synthetic input sizes",
+    )
+    pipeline_parser.add_argument(
+        "-s",
+        "--sources",
+        nargs="+",
+        default=list(SYNTHETIC),
+        choices=list(SYNTHETIC),
+        help="Sources to benchmark",
+    )
+    pipeline_parser.add_argument(
+        "--pdf", help="Also time a real Club Visits pdf report"
+    )
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    startup_parser = subparsers.add_parser(
+        "startup",
+        help="Time script startup and imports with -X importtime",
+    )
+    startup_parser.add_argument(
+        "scripts",
+        nargs="*",
+        default=STARTUP_SCRIPTS,
+        metavar="SCRIPT",
+        help="Scripts to start with --help",
+    )
+    startup_parser.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,57 @@
 #!/usr/bin/python3
 
-from bs4 import BeautifulSoup
-from datetime import timedelta
-from dateutil import tz
-from dateutil.parser import parse
-from geopy.geocoders import GoogleV3
-from icalendar import Calendar, Event, vCalAddress, vText
-from pathlib import Path
-from pprint import pprint
-import os
-import re
+from createics.metrics import add_metrics_arguments, metrics_from_args
+from createics.pipeline import Pipeline, add_event_cache_argument
+from createics.sources.maxpreps import MaxPrepsSource
+import argparse
+import logging
 
 
-api_key = os.environ.get("MAPS_API_KEY")
-
-geolocator = GoogleV3(api_key=api_key)
-
-script_name = Path(__file__).stem
-
-filename = "schedule.html"
-
-soup = BeautifulSoup(open(filename), "html.parser")
-
-team_name = (
-    soup.find("h1", {"id": "Team_highlight_info1_Header"}).get_text().split()[0]
-)
-
-team_address = geolocator.geocode(
-    soup.find("address").get_text().strip()
-).address
-
-schedule_table = soup.find("table", {"id": "schedule"}).tbody
-
-cal = Calendar()
-
-# Some properties are required to be compliant
-cal.add("prodid", f"-//{script_name}//{team_name}//EN")
-cal.add("version", "2.0")
-
-for tr in schedule_table.find_all("tr"):
-    date = tr.find(class_="event-time")["title"]
-    opponent = (
-        tr.find(class_=re.compile(r"contest-type-indicator"))
-        .contents[0]
-        .strip()
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create calendar from MaxPreps printable schedule.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
-    opponent_city = tr.find(class_="contest-city-state").get_text().strip("()")
-    away = tr.find(class_="away-indicator")
-    location = tr.find(class_="contest-location")["title"]
-
-    # print(date)
-    # print(opponent)
-    # print(away)
-    # print(opponent_city)
-    # print(location)
-
-    if away:
-        title = f"{team_name} vs. {opponent}"
-        address = geolocator.geocode(f"{location}, {opponent_city}")
-        # pprint(address.raw)
-    else:
-        title = f"{opponent} vs. {team_name}"
-        address = team_address
-
-    title += " HS Basketball Game"
-
-    # print(date)
-    # print(opponent)
-    # print(opponent_city)
-    # print(title)
-
-    start_time = parse(date).replace(tzinfo=tz.tzutc())
-    start_time = start_time - timedelta(hours=3)
-    end_time = start_time + timedelta(hours=2)
+    parser.add_argument(
+        "html_file",
+        nargs="?",
+        default="schedule.html",
+        help="Input schedule html file",
+    )
+    parser.add_argument(
+        "ics_file",
+        nargs="?",
+        default="out.ics",
+        help="Output calendar ics file",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Only rewrite new, changed or cancelled events of ics_file",
+    )
+    parser.add_argument(
+        "--fast-html",
+        action="store_true",
+        help="Parse only the needed parts of the page with lxml",
+    )
+    parser.add_argument(
+        "-d", "--debug", action="store_true", help="Enable debugging"
+    )
+    add_event_cache_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
 
-    # print(start_time.strftime('%Y-%m-%d %I:%M %p'))
-    # print(start_time.astimezone().strftime('%Y-%m-%d %I:%M %p'))
-    # print(end_time.astimezone().strftime('%Y-%m-%d %I:%M %p'))
+    level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
 
-    uid = re.sub(r"[-:]", "", date) + "@" + team_name
+    source = MaxPrepsSource(args.html_file, fast_html=args.fast_html)
+    metrics = metrics_from_args(args, "create-ics")
+    pipeline = Pipeline(metrics=metrics, cache_events=args.event_cache)
+    pipeline.build(source, args.ics_file, args.incremental)
+    if args.metrics:
+        metrics.write(args.metrics, args.metrics_format)
 
-    event = Event()
-    event.add("summary", title)
-    event.add("description", title)
-    event.add("dtstart", start_time)
-    event.add("dtend", end_time)
-    event.add("location", f"{location}, {address}")
-    event["uid"] = uid
-    cal.add_component(event)
 
-with open("out.ics", "wb") as fh:
-    fh.write(cal.to_ical())
+if __name__ == "__main__":
+    main()
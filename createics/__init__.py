@@ -0,0 +1 @@
+"""Shared helpers for the create-ics calendar scripts."""
@@ -0,0 +1,76 @@
+"""Canonical form of postal addresses, used as the geocode dedupe key.
+
+Venue strings come from map links, table cells and pdf cells that
+differ only in case, spacing, line breaks, punctuation or abbreviation
+("1 Main St." and "1  main street").  normalize_address() maps such
+variants to one key, so each venue is geocoded and cached once.
+"""
+
+
+STREET_SUFFIXES = {
+    "aly": "alley",
+    "av": "avenue",
+    "ave": "avenue",
+    "blvd": "boulevard",
+    "cir": "circle",
+    "ct": "court",
+    "dr": "drive",
+    "expy": "expressway",
+    "hwy": "highway",
+    "ln": "lane",
+    "pkwy": "parkway",
+    "pl": "place",
+    "plz": "plaza",
+    "rd": "road",
+    "sq": "square",
+    "st": "street",
+    "ter": "terrace",
+    "tpke": "turnpike",
+}
+
+# abbreviations that start a name rather than end a street
+NAME_PREFIXES = {
+    "ft": "fort",
+    "mt": "mount",
+    "st": "saint",
+}
+
+DIRECTIONS = {
+    "n": "north",
+    "s": "south",
+    "e": "east",
+    "w": "west",
+    "ne": "northeast",
+    "nw": "northwest",
+    "se": "southeast",
+    "sw": "southwest",
+}
+
+
+def normalize_part(part):
+    words = part.split()
+    last = len(words) - 1
+    expanded = []
+    for i, word in enumerate(words):
+        after = words[i + 1] if i < last else None
+        before = words[i - 1] if i > 0 else None
+        if word in DIRECTIONS and (
+            (after is not None and after not in DIRECTIONS)
+            or before in STREET_SUFFIXES
+        ):
+            word = DIRECTIONS[word]
+        elif word in STREET_SUFFIXES and i > 0 and (
+            after is None or after in DIRECTIONS
+        ):
+            word = STREET_SUFFIXES[word]
+        elif word in NAME_PREFIXES and after is not None:
+            word = NAME_PREFIXES[word]
+        expanded.append(word)
+    return " ".join(expanded)
+
+
+def normalize_address(address):
+    """Return the dedupe key for address."""
+    address = address.lower().replace(".", "")
+    parts = (normalize_part(part) for part in address.split(","))
+    return ", ".join(part for part in parts if part)
@@ -0,0 +1,113 @@
+"""Backfill Club Visits reports and calendars over a long date range.
+
+The range is split into one report window per calendar month.  Windows
+whose pdf or calendar is already in the output directory are skipped,
+so an interrupted backfill picks up where it stopped: downloads and
+calendars are only renamed into place once they are complete.
+"""
+
+from datetime import timedelta
+import logging
+import os
+
+from createics.batch import run_batch
+from createics.download import (
+    download_ranges,
+    load_config,
+    report_file_name,
+)
+from createics.pipeline import change_ext
+
+
+def month_windows(start_date, end_date):
+    """Split start_date..end_date (inclusive) into per-month windows."""
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        next_week = window_start.replace(day=28) + timedelta(days=4)
+        next_month = next_week.replace(day=1)
+        window_end = min(next_month - timedelta(days=1), end_date)
+        windows.append((window_start, window_end))
+        window_start = next_month
+    return windows
+
+
+def plan_backfill(windows, output_dir):
+    """Sort windows into those to download and those only to convert.
+
+    Returns (downloads, conversions) with windows that already have a
+    calendar left out of both.
+    """
+    downloads = []
+    conversions = []
+    for window in windows:
+        pdf_file = os.path.join(output_dir, report_file_name(*window))
+        if os.path.isfile(change_ext(pdf_file, ".ics")):
+            logging.debug(f"Skipping {pdf_file}, calendar exists")
+        elif os.path.isfile(pdf_file):
+            conversions.append(window)
+        else:
+            downloads.append(window)
+    return downloads, conversions
+
+
+def run_backfill(
+    config_file,
+    start_date,
+    end_date,
+    output_dir,
+    workers=None,
+    sessions=1,
+    pdf_backend="tabula",
+    **download_options,
+):
+    """Download and convert every missing window in the range.
+
+    config_file is only read when there is something to download.
+
+    Returns a dict mapping each window that needed work to its calendar
+    path, or None when it could not be downloaded or converted.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    windows = month_windows(start_date, end_date)
+    downloads, conversions = plan_backfill(windows, output_dir)
+    logging.info(
+        f"{len(windows)} windows: {len(downloads)} to download, "
+        f"{len(conversions)} to convert, "
+        f"{len(windows) - len(downloads) - len(conversions)} done"
+    )
+
+    results = {}
+    if downloads:
+        downloaded = download_ranges(
+            load_config(config_file),
+            downloads,
+            sessions=sessions,
+            download_dir=output_dir,
+            **download_options,
+        )
+        for window in downloads:
+            if downloaded.get(window):
+                conversions.append(window)
+            else:
+                results[window] = None
+
+    if not conversions:
+        return results
+
+    jobs = {}
+    for window in sorted(conversions):
+        pdf_file = os.path.join(output_dir, report_file_name(*window))
+        jobs[pdf_file] = window
+
+    built = run_batch(
+        [
+            ("club-visits", pdf_file, change_ext(pdf_file, ".ics"))
+            for pdf_file in jobs
+        ],
+        workers,
+        source_options={"backend": pdf_backend},
+    )
+    for (_, pdf_file, ics_file), count, error in built:
+        results[jobs[pdf_file]] = ics_file if error is None else None
+    return results
@@ -0,0 +1,146 @@
+"""Build many calendars in one invocation across a process pool.
+
+Every worker process keeps one Pipeline for its lifetime, so the
+imports, geocoder and timezone objects are set up once per core rather
+than once per feed.  All workers share the on-disk geocode cache.
+"""
+
+import glob
+import logging
+import shlex
+
+from createics.metrics import NULL_METRICS, Metrics
+from createics.pipeline import Pipeline, change_ext
+from createics.sources import HtmlScheduleSource, get_source
+
+
+_pipeline = None
+
+
+def read_manifest(path):
+    """Parse a manifest of "SOURCE INPUT [OUTPUT]" lines.
+
+    Blank lines and lines starting with # are ignored.  INPUT may be a
+    glob pattern, in which case OUTPUT must be omitted.
+    """
+    jobs = []
+    with open(path) as fh:
+        for lineno, line in enumerate(fh, 1):
+            fields = shlex.split(line, comments=True)
+            if not fields:
+                continue
+            if len(fields) > 3:
+                raise ValueError(f"{path}:{lineno}: too many fields")
+            source_name, pattern, *output = fields
+            jobs.extend(expand_inputs([pattern], source_name, *output))
+    return jobs
+
+
+def expand_inputs(patterns, source_name, ics_file=None):
+    jobs = []
+    for pattern in patterns:
+        input_files = sorted(glob.glob(pattern)) or [pattern]
+        if ics_file is not None and len(input_files) > 1:
+            raise ValueError(f"Output file given for glob {pattern!r}")
+        for input_file in input_files:
+            output = ics_file or change_ext(input_file, ".ics")
+            jobs.append((source_name, input_file, output))
+    return jobs
+
+
+def init_worker(level, cache_events=False, geocode_next_time=None):
+    global _pipeline
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
+    _pipeline = Pipeline(cache_events=cache_events)
+    if geocode_next_time is not None:
+        from createics.geocache import share_rate_limit
+
+        share_rate_limit(geocode_next_time)
+
+
+def make_source(job, fast_html=False, source_options=None):
+    source_name, input_file, ics_file = job
+    source_class = get_source(source_name)
+    options = dict(source_options or {})
+    if issubclass(source_class, HtmlScheduleSource):
+        options["fast_html"] = fast_html
+    return source_class(input_file, **options)
+
+
+def build_job(
+    job,
+    incremental=False,
+    fast_html=False,
+    source_options=None,
+    collect_metrics=False,
+):
+    """Build one job and return its event count.
+
+    With collect_metrics, return (count, metrics snapshot) instead.
+    """
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = Pipeline()
+    source = make_source(job, fast_html, source_options)
+    if not collect_metrics:
+        return _pipeline.build(source, job[2], incremental)
+
+    _pipeline.metrics = Metrics(job[0])
+    try:
+        count = _pipeline.build(source, job[2], incremental)
+        return count, _pipeline.metrics.snapshot()
+    finally:
+        _pipeline.metrics = NULL_METRICS
+
+
+def run_batch(
+    jobs,
+    workers=None,
+    incremental=False,
+    fast_html=False,
+    source_options=None,
+    metrics=None,
+    cache_events=False,
+):
+    """Build every job and return a list of (job, count, error).
+
+    source_options are extra keyword arguments for every source.  The
+    timings and counters of every job are added to metrics, if given.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import Value
+
+    results = []
+    collect = metrics is not None and metrics.enabled
+    level = logging.getLogger().getEffectiveLevel()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        # the workers share one geocode rate limit, not one each
+        initargs=(level, cache_events, Value("d")),
+    ) as executor:
+        futures = [
+            (
+                job,
+                executor.submit(
+                    build_job,
+                    job,
+                    incremental,
+                    fast_html,
+                    source_options,
+                    collect,
+                ),
+            )
+            for job in jobs
+        ]
+        for job, future in futures:
+            try:
+                count = future.result()
+                if collect:
+                    count, snapshot = count
+                    metrics.merge(snapshot)
+                results.append((job, count, None))
+            except Exception as e:
+                logging.error(f"{job[1]}: {e}")
+                results.append((job, None, e))
+    return results
@@ -0,0 +1,167 @@
+"""Persistent, time-ordered store of every club check-in.
+
+Monthly Club Visits reports are merged into one SQLite table keyed by
+start time, so duplicates and close check-ins are caught across month
+boundaries too.  Each proximity check is a range lookup on the primary
+key, O(log n) however long the history grows.
+
+A history is years of visits to a handful of clubs, so each check-in
+refers to its club and address by an id into a locations table.
+"""
+
+import os
+import time
+
+from createics.paths import connect, data_dir
+
+
+def default_store_file():
+    if os.environ.get("CHECKIN_STORE"):
+        return os.environ["CHECKIN_STORE"]
+    return os.path.join(data_dir(), "checkins.sqlite")
+
+
+CREATE_CHECKINS = (
+    "CREATE TABLE IF NOT EXISTS checkins ("
+    " start INTEGER PRIMARY KEY,"
+    " checkin_time TEXT NOT NULL,"
+    " location INTEGER NOT NULL REFERENCES locations (id),"
+    " source TEXT NOT NULL)"
+)
+
+
+class CheckinStore:
+    """SQLite table of check-ins keyed by UTC start time in seconds."""
+
+    def __init__(self, path=None):
+        self.path = path or default_store_file()
+        self.conn = connect(self.path)
+        self.location_ids = {}
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS locations ("
+            " id INTEGER PRIMARY KEY,"
+            " club TEXT NOT NULL,"
+            " address TEXT NOT NULL,"
+            " UNIQUE (club, address))"
+        )
+        columns = [
+            row[1] for row in self.conn.execute("PRAGMA table_info(checkins)")
+        ]
+        if "club" in columns:
+            self.upgrade()
+        else:
+            self.conn.execute(CREATE_CHECKINS)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " name TEXT PRIMARY KEY,"
+            " mtime REAL NOT NULL,"
+            " merged REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def upgrade(self):
+        """Move the club and address text of an older store to locations."""
+        self.conn.commit()
+        self.conn.executescript(
+            "BEGIN;"
+            " ALTER TABLE checkins RENAME TO checkins_old;"
+            f" {CREATE_CHECKINS};"
+            " INSERT OR IGNORE INTO locations (club, address)"
+            "  SELECT DISTINCT club, address FROM checkins_old;"
+            " INSERT INTO checkins"
+            "  SELECT start, checkin_time, locations.id, source"
+            "  FROM checkins_old JOIN locations USING (club, address);"
+            " DROP TABLE checkins_old;"
+            " COMMIT;"
+        )
+
+    def location_id(self, club, address):
+        key = (club, address)
+        if key not in self.location_ids:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO locations (club, address)"
+                " VALUES (?, ?)",
+                key,
+            )
+            self.location_ids[key] = self.conn.execute(
+                "SELECT id FROM locations WHERE club = ? AND address = ?",
+                key,
+            ).fetchone()[0]
+        return self.location_ids[key]
+
+    def __len__(self):
+        row = self.conn.execute("SELECT COUNT(*) FROM checkins").fetchone()
+        return row[0]
+
+    def is_merged(self, source, mtime):
+        row = self.conn.execute(
+            "SELECT mtime FROM sources WHERE name = ?", (source,)
+        ).fetchone()
+        return row is not None and row[0] >= mtime
+
+    def neighbor(self, start, min_gap):
+        """Return the stored start time nearest to start within min_gap."""
+        row = self.conn.execute(
+            "SELECT start FROM checkins"
+            " WHERE start > ? AND start < ?"
+            " ORDER BY abs(start - ?) LIMIT 1",
+            (start - min_gap, start + min_gap, start),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def merge(self, rows, source, mtime, min_gap):
+        """Add (start, checkin_time, club, address) rows from source.
+
+        Rows should be in start order.  A row within min_gap seconds of
+        a stored check-in is not added; those rows are returned with
+        the start time they collided with.
+        """
+        rejected = []
+        try:
+            with self.conn:
+                for row in rows:
+                    start = int(row[0])
+                    other = self.neighbor(start, min_gap)
+                    if other is not None:
+                        rejected.append((row, other))
+                        continue
+                    _, checkin_time, club, address = row
+                    location = self.location_id(club, address)
+                    self.conn.execute(
+                        "INSERT INTO checkins VALUES (?, ?, ?, ?)",
+                        (start, checkin_time, location, source),
+                    )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                    (source, mtime, time.time()),
+                )
+        except BaseException:
+            # locations added by the rolled back merge are gone too
+            self.location_ids.clear()
+            raise
+        return rejected
+
+    def frame(self):
+        """Return every stored check-in as a DataFrame, oldest first.
+
+        Club and address are categorical columns, so their text is held
+        once per location rather than once per check-in.
+        """
+        import pandas as pd
+
+        locations = pd.read_sql_query(
+            "SELECT id, club, address FROM locations",
+            self.conn,
+            index_col="id",
+        )
+        df = pd.read_sql_query(
+            "SELECT start, checkin_time, location FROM checkins"
+            " ORDER BY start",
+            self.conn,
+        )
+        for name in ("club", "address"):
+            df[name] = df["location"].map(locations[name]).astype("category")
+        return df.drop(columns="location")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,210 @@
+"""Fast date parsing for schedule tables.
+
+The rows of one table all share a date format, so DateParser finds a
+strptime format that matches the first row, compiles it into a regular
+expression and reuses that for the rest.  dateutil's much slower
+heuristic parser is only used for rows that no known format matches.
+
+Schedules and check-in logs often give only month and day.  Such rows
+are parsed once with PLACEHOLDER_YEAR, and YearRollover then works out
+in a single pass where the table crosses into a new year.
+"""
+
+from datetime import datetime, timedelta
+import calendar
+import re
+
+
+DEFAULT_FORMATS = [
+    # athletics pages: "Dec 3, 2024 4:30 PM"
+    "%b %d, %Y %I:%M %p",
+    "%B %d, %Y %I:%M %p",
+    "%a, %b %d, %Y %I:%M %p",
+    "%m/%d, %Y %I:%M %p",
+    # gym app check-ins: "1/5/2023 6:30am"
+    "%m/%d/%Y %I:%M%p",
+    # club visits report
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    # maxpreps event-time titles
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+]
+
+# a leap year, so that Feb 29 parses before the real year is known
+PLACEHOLDER_YEAR = 2000
+
+DIRECTIVES = {
+    "Y": r"(?P<Y>\d{4})",
+    "m": r"(?P<m>\d{1,2})",
+    "d": r"(?P<d>\d{1,2})",
+    "H": r"(?P<H>\d{1,2})",
+    "I": r"(?P<I>\d{1,2})",
+    "M": r"(?P<M>\d{2})",
+    "S": r"(?P<S>\d{2})",
+    "p": r"(?P<p>[AaPp][Mm])",
+    "b": r"(?P<b>[A-Za-z]{3})",
+    "B": r"(?P<B>[A-Za-z]+)",
+    "a": r"[A-Za-z]{3}",
+}
+
+MONTHS = {
+    name.lower(): number
+    for names in (calendar.month_abbr, calendar.month_name)
+    for number, name in enumerate(names)
+    if name
+}
+
+
+def compile_format(fmt):
+    """Translate a strptime format into a compiled regular expression.
+
+    Returns None if fmt uses a directive without a regex equivalent.
+    """
+    pattern = ""
+    for literal, directive in re.findall(r"([^%]*)(?:%(.))?", fmt):
+        pattern += re.escape(literal)
+        if directive:
+            if directive not in DIRECTIVES:
+                return None
+            pattern += DIRECTIVES[directive]
+    return re.compile(pattern + r"\Z")
+
+
+def build_datetime(fields):
+    month = fields.get("m") or fields.get("b") or fields.get("B")
+    month = int(month) if month.isdigit() else MONTHS[month.lower()]
+    if fields.get("I"):
+        hour = int(fields["I"])
+        if not 1 <= hour <= 12:
+            # rejected by strptime too
+            raise ValueError(f"{hour} is not a 12-hour clock hour")
+        hour %= 12
+        if fields["p"].lower() == "pm":
+            hour += 12
+    else:
+        hour = int(fields["H"])
+    return datetime(
+        int(fields["Y"]),
+        month,
+        int(fields["d"]),
+        hour,
+        int(fields["M"]),
+        int(fields.get("S") or 0),
+    )
+
+
+class DateParser:
+    def __init__(self, formats=DEFAULT_FORMATS):
+        self.formats = list(formats)
+        self.format = None
+        self.regex = None
+        self.fallbacks = 0
+
+    def learn(self, fmt):
+        self.format = fmt
+        self.regex = compile_format(fmt)
+
+    def parse(self, text):
+        text = " ".join(text.split())
+        if self.regex is not None:
+            match = self.regex.match(text)
+            if match:
+                try:
+                    return build_datetime(match.groupdict())
+                except (KeyError, ValueError):
+                    pass
+
+        for fmt in self.formats:
+            try:
+                value = datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            if fmt != self.format:
+                self.learn(fmt)
+            return value
+
+        # only imported when needed, as it is slow to import
+        from dateutil.parser import parse
+
+        self.fallbacks += 1
+        return parse(text)
+
+
+class YearRollover:
+    """Count the year boundaries in a chronological run of dates.
+
+    Feed the dates, parsed with PLACEHOLDER_YEAR, to offset() in table
+    order.  A jump back of more than max_gap, as from December to
+    January, starts the next year; smaller steps back (a game listed
+    out of order) do not.  With descending, for newest-first logs, a
+    jump forward starts the previous year instead.
+    """
+
+    def __init__(self, descending=False, max_gap=timedelta(days=183)):
+        self.step = -1 if descending else 1
+        self.max_gap = max_gap
+        self.current = 0
+        self.previous = None
+
+    def offset(self, date):
+        """Return the year offset of date from the first date."""
+        if self.previous is not None:
+            if (date - self.previous) * self.step < -self.max_gap:
+                self.current += self.step
+        self.previous = date
+        return self.current
+
+
+def with_year(date, year):
+    try:
+        return date.replace(year=year)
+    except ValueError:
+        raise ValueError(f"{date:%b %d} is not a date in {year}") from None
+
+
+def fits(dated, year):
+    """Return whether every date exists with the first in year."""
+    return not any(
+        date.month == 2
+        and date.day == 29
+        and not calendar.isleap(year + offset)
+        for offset, date in dated
+    )
+
+
+def last_date(dated):
+    """Return the latest (offset, date) pair of a table."""
+    return max(dated, key=lambda pair: (pair[0], pair[1]))
+
+
+def season_start_year(dated, today):
+    """Return the year of the first row of a schedule.
+
+    dated holds the (offset, date) pairs of every row.  The season is
+    placed so that it has not ended before today: the current season,
+    or the next one once this one is over.
+    """
+    end_offset, end = last_date(dated)
+    year = today.year - end_offset
+    if end < today.replace(year=PLACEHOLDER_YEAR):
+        year += 1
+    while not fits(dated, year):
+        year += 1
+    return year
+
+
+def log_start_year(dated, today):
+    """Return the year of the first row of a log of past dates.
+
+    The log is placed so that its latest date is not after today.
+    """
+    end_offset, end = last_date(dated)
+    year = today.year - end_offset
+    if end > today.replace(year=PLACEHOLDER_YEAR):
+        year -= 1
+    while not fits(dated, year):
+        year -= 1
+    return year
@@ -0,0 +1,424 @@
+"""Download Club Visits pdf reports from the member site.
+
+A ReportSession logs in once and can then download any number of date
+ranges with the same browser.  Several sessions can run side by side
+to fetch a long backfill faster.
+
+When config.toml names the report endpoint (report_url), an
+HttpReportSession fetches the pdf directly over a pooled HTTP session
+instead, with the browser as a fallback.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import logging
+import os
+import threading
+import time
+
+
+def format_date_search(date):
+    return date.strftime("%m/%d/%Y")
+
+
+def format_date_file(date):
+    return date.strftime("%Y%m%d")
+
+
+def first_day_of_prev_month():
+    now = date.today()
+    first_day = (now - timedelta(days=now.day)).replace(day=1)
+    return format_date_search(first_day)
+
+
+def last_day_of_prev_month():
+    last_day = date.today().replace(day=1) - timedelta(days=1)
+    return format_date_search(last_day)
+
+
+def report_file_name(start_date, end_date):
+    return (
+        f"Club-Visits-{format_date_file(start_date)}-"
+        f"{format_date_file(end_date)}.pdf"
+    )
+
+
+def load_config(config_file):
+    import tomli
+
+    with open(config_file, "rb") as f:
+        return tomli.load(f)
+
+
+def save_source(driver, filepath):
+    with open(filepath, "w") as out:
+        out.write(driver.page_source)
+
+
+def wait_for_file(filepath, timeout):
+    """Wait until filepath appears, returning whether it did.
+
+    Uses a watchdog observer on the file's directory when watchdog is
+    installed and falls back to polling otherwise.
+    """
+    if os.path.exists(filepath):
+        return True
+
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            if os.path.exists(filepath):
+                return True
+        return False
+
+    target = os.path.abspath(filepath)
+    appeared = threading.Event()
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # chrome downloads to a .crdownload file and renames it
+            paths = [event.src_path, getattr(event, "dest_path", "")]
+            if target in map(os.path.abspath, filter(None, paths)):
+                appeared.set()
+
+    observer = Observer()
+    observer.schedule(Handler(), os.path.dirname(target))
+    observer.start()
+    try:
+        # the file may have appeared before the observer started
+        if os.path.exists(filepath):
+            return True
+        appeared.wait(timeout)
+        return os.path.exists(filepath)
+    finally:
+        observer.stop()
+        observer.join()
+
+
+class ReportSession:
+    def __init__(
+        self,
+        config,
+        download_dir=None,
+        headless=False,
+        logdir=None,
+        timeout=10,
+    ):
+        self.config = config
+        self.download_dir = download_dir or os.getcwd()
+        self.headless = headless
+        self.logdir = logdir or os.path.join(os.path.expanduser("~"), "logs")
+        self.timeout = timeout
+        self.driver = None
+        self.fresh_page = False
+
+    def __enter__(self):
+        self.start()
+        try:
+            self.login()
+        except BaseException:
+            # __exit__ is not called when __enter__ fails
+            self.driver.quit()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.logout()
+        finally:
+            self.driver.quit()
+
+    def start(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        options = webdriver.ChromeOptions()
+        prefs = {"download.default_directory": self.download_dir}
+        options.add_experimental_option("prefs", prefs)
+
+        if self.headless:
+            options.add_argument("--window-size=1920,1080")
+            options.add_argument("--start-maximized")
+            options.add_argument("--headless")
+
+        service = ChromeService(ChromeDriverManager().install())
+        self.driver = webdriver.Chrome(options=options, service=service)
+
+    def wait_clickable(self, locator, timeout=30):
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        return WebDriverWait(self.driver, timeout).until(
+            EC.element_to_be_clickable(locator)
+        )
+
+    def login(self):
+        from selenium.webdriver.common.by import By
+
+        self.driver.get(self.config["visits_url"])
+
+        username_box = self.wait_clickable(
+            (By.ID, "myaccount-login-info-usrname")
+        )
+        username_box.send_keys(self.config["username"])
+        password_box = self.driver.find_element(
+            By.ID, "myaccount-login-info-passwrd"
+        )
+        password_box.send_keys(self.config["password"])
+        password_box.submit()
+        self.fresh_page = True
+
+    def logout(self):
+        from selenium.webdriver.common.by import By
+
+        self.driver.find_element(By.ID, "my-account-nav-section").click()
+        logout_button = self.wait_clickable(
+            (By.XPATH, "//button[@class='logout-link']")
+        )
+        logout_button.click()
+        self.wait_clickable((By.ID, "myaccount-login-info-usrname"))
+
+    def set_date(self, div_id, value, timeout):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+
+        date_input = self.wait_clickable(
+            (By.XPATH, f"//div[@id='{div_id}']/input"), timeout
+        )
+        date_input.click()
+        date_input.clear()
+        date_input.send_keys(value)
+        date_input.send_keys(Keys.RETURN)
+
+    def download(self, start_date, end_date):
+        """Download one report and return its path, or None on timeout."""
+        from selenium.webdriver.common.by import By
+
+        pdf_file = os.path.join(
+            self.download_dir, report_file_name(start_date, end_date)
+        )
+
+        # the report page is already showing right after login
+        if not self.fresh_page:
+            self.driver.get(self.config["visits_url"])
+        self.fresh_page = False
+
+        self.set_date("endDate", format_date_search(end_date), 10)
+        self.set_date("startDate", format_date_search(start_date), 5)
+
+        self.driver.find_element(
+            By.ID, "membership-clubvisits-filters-go-btn"
+        ).click()
+
+        log_name = f"24hr_checkins-{format_date_file(start_date)}"
+        save_source(self.driver, os.path.join(self.logdir, f"{log_name}.html"))
+        self.driver.save_screenshot(
+            os.path.join(self.logdir, f"{log_name}_screenshot.png")
+        )
+
+        print_button = self.wait_clickable((By.ID, "pt-print"))
+        print_button.click()
+
+        if not wait_for_file(pdf_file, self.timeout):
+            logging.error(f"Timed out waiting for {pdf_file}")
+            return None
+        return pdf_file
+
+
+class HttpReportSession:
+    """Fetch reports straight from the report endpoint.
+
+    Uses these config.toml keys besides username and password:
+
+        login_url         form the credentials are posted to
+        report_url        endpoint returning the pdf for a date range
+        logout_url        optional, requested when the session ends
+        username_field    login form field names (default: username
+        password_field    and password)
+        start_date_param  report query parameters (default: startDate
+        end_date_param    and endDate)
+    """
+
+    def __init__(self, config, download_dir=None, timeout=10, pool_size=4):
+        self.config = config
+        self.download_dir = download_dir or os.getcwd()
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+
+    def __enter__(self):
+        self.start()
+        try:
+            self.login()
+        except BaseException:
+            self.session.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.config.get("logout_url"):
+                self.session.get(self.config["logout_url"], timeout=30)
+        finally:
+            self.session.close()
+
+    def start(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size, pool_maxsize=self.pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def login(self):
+        config = self.config
+        response = self.session.post(
+            config["login_url"],
+            data={
+                config.get("username_field", "username"): config["username"],
+                config.get("password_field", "password"): config["password"],
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+
+    def download(self, start_date, end_date):
+        """Download one report and return its path, or None on failure."""
+        config = self.config
+        pdf_file = os.path.join(
+            self.download_dir, report_file_name(start_date, end_date)
+        )
+        start_param = config.get("start_date_param", "startDate")
+        end_param = config.get("end_date_param", "endDate")
+        params = {
+            start_param: format_date_search(start_date),
+            end_param: format_date_search(end_date),
+        }
+
+        tmp_file = f"{pdf_file}.part"
+        try:
+            with self.session.get(
+                config["report_url"],
+                params=params,
+                stream=True,
+                timeout=self.timeout,
+            ) as response:
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=64 * 1024)
+                first = next(chunks, b"")
+                if not first.startswith(b"%PDF"):
+                    logging.error(
+                        f"{config['report_url']} did not return a pdf"
+                        f" for {pdf_file}"
+                    )
+                    return None
+                with open(tmp_file, "wb") as fh:
+                    fh.write(first)
+                    for chunk in chunks:
+                        fh.write(chunk)
+            os.replace(tmp_file, pdf_file)
+        except Exception as e:
+            logging.error(f"Fetching {pdf_file} failed: {e}")
+            return None
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        return pdf_file
+
+
+def http_download_ranges(config, ranges, sessions=1, **options):
+    if not ranges:
+        return {}
+
+    workers = max(1, min(sessions, len(ranges)))
+    with HttpReportSession(config, pool_size=workers, **options) as session:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            paths = executor.map(lambda r: session.download(*r), ranges)
+            return dict(zip(ranges, paths))
+
+
+def browser_download_ranges(config, ranges, sessions=1, **session_options):
+    """Download every (start_date, end_date) range with Chrome.
+
+    The ranges are dealt out to up to sessions logged-in browsers.
+    Returns a dict mapping each range to its pdf path (None on failure).
+    """
+    if not ranges:
+        return {}
+
+    sessions = max(1, min(sessions, len(ranges)))
+    chunks = [ranges[i::sessions] for i in range(sessions)]
+
+    def run(chunk):
+        results = {}
+        with ReportSession(config, **session_options) as session:
+            for start_date, end_date in chunk:
+                results[start_date, end_date] = session.download(
+                    start_date, end_date
+                )
+        return results
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        for chunk_results in executor.map(run, chunks):
+            results.update(chunk_results)
+    return results
+
+
+def download_ranges(
+    config,
+    ranges,
+    sessions=1,
+    backend="chrome",
+    download_dir=None,
+    timeout=10,
+    headless=False,
+    logdir=None,
+):
+    """Download every (start_date, end_date) range.
+
+    backend is "http", "chrome" or "auto", which tries http first (when
+    config has a report_url) and uses chrome for whatever it missed.
+    Returns a dict mapping each range to its pdf path (None on failure).
+    """
+    results = {}
+    if backend in ("http", "auto") and config.get("report_url"):
+        try:
+            results = http_download_ranges(
+                config,
+                ranges,
+                sessions,
+                download_dir=download_dir,
+                timeout=timeout,
+            )
+        except Exception as e:
+            if backend == "http":
+                raise
+            logging.warning(f"Direct report fetch failed: {e}")
+        if backend == "http":
+            return results
+        ranges = [r for r in ranges if not results.get(r)]
+    elif backend == "http":
+        raise ValueError("config.toml has no report_url for http backend")
+
+    results.update(
+        browser_download_ranges(
+            config,
+            ranges,
+            sessions,
+            download_dir=download_dir,
+            headless=headless,
+            logdir=logdir,
+            timeout=timeout,
+        )
+    )
+    return results
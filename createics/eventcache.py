@@ -0,0 +1,119 @@
+"""Cache of serialized VEVENT blocks between runs.
+
+Most events in a regenerated calendar are the same as last time.  Each
+block is stored per calendar and UID along with a hash of the fields it
+was made from, so an unchanged event is written as the stored bytes
+without formatting it again.
+
+Only formatting is skipped; rows are still parsed, dated and geocoded.
+Loading and saving the blocks costs about as much as it saves, so the
+cache is off unless a script is run with --event-cache.
+"""
+
+import hashlib
+import os
+
+from createics.icswriter import FORMAT_VERSION, format_event, tzid
+from createics.paths import cache_dir, connect
+
+
+FIELDS = (
+    "uid",
+    "summary",
+    "location",
+    "description",
+    "sequence",
+    "status",
+)
+
+
+def default_cache_file():
+    return os.path.join(cache_dir(), "events.sqlite")
+
+
+def event_key(fields):
+    """Hash the fields of an event, its timezones and the writer version."""
+    parts = [str(fields.get(name)) for name in FIELDS]
+    # no SEQUENCE is written for sequence 0
+    parts[FIELDS.index("sequence")] = str(fields.get("sequence") or 0)
+    parts.append(str(FORMAT_VERSION))
+    for name in ("dtstart", "dtend"):
+        dt = fields[name]
+        parts.append(f"{dt.isoformat()} {tzid(dt)}")
+    data = "\x1f".join(parts).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class EventCache:
+    """Serialized events of one calendar file, keyed by UID."""
+
+    def __init__(self, calendar, path=None):
+        self.calendar = os.path.abspath(calendar)
+        self.path = path or default_cache_file()
+        self.blocks = None
+        self.updated = {}
+        self.seen = set()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        self.conn = connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " calendar TEXT NOT NULL,"
+            " uid TEXT NOT NULL,"
+            " key BLOB NOT NULL,"
+            " block BLOB NOT NULL,"
+            " PRIMARY KEY (calendar, uid))"
+        )
+        self.blocks = {
+            uid: (key, block)
+            for uid, key, block in self.conn.execute(
+                "SELECT uid, key, block FROM events WHERE calendar = ?",
+                (self.calendar,),
+            )
+        }
+
+    def format_event(self, **fields):
+        """Return the block for fields, formatting it only if needed."""
+        if self.blocks is None:
+            self.load()
+        key = event_key(fields)
+        uid = fields["uid"]
+        self.seen.add(uid)
+        cached = self.blocks.get(uid)
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        block = format_event(**fields)
+        self.blocks[uid] = self.updated[uid] = (key, block)
+        return block
+
+    def save(self):
+        """Store the blocks formatted during this run.
+
+        Events that were not written this run are dropped.
+        """
+        if self.blocks is None:
+            return
+        stale = set(self.blocks) - self.seen
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM events WHERE calendar = ? AND uid = ?",
+                [(self.calendar, uid) for uid in stale],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)",
+                [
+                    (self.calendar, uid, key, block)
+                    for uid, (key, block) in self.updated.items()
+                ],
+            )
+        self.updated = {}
+        for uid in stale:
+            del self.blocks[uid]
+
+    def close(self):
+        if self.blocks is not None:
+            self.conn.close()
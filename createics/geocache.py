@@ -0,0 +1,374 @@
+"""Persistent geocode cache shared by the calendar scripts.
+
+The geolocator behind the cache is chosen with $GEOCODER:
+
+  google  the Google Maps API, using $MAPS_API_KEY (the default)
+  record  Google, also saving every response to $GEOCODE_FIXTURE
+  replay  answer from $GEOCODE_FIXTURE only, without network access
+  stub    answer every query with the query itself, without network
+
+The record, replay and stub backends bypass the on-disk cache, so each
+run sees only its own backend's answers.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import json
+import logging
+import os
+import threading
+import time
+
+from createics.address import normalize_address
+from createics.paths import cache_dir, connect
+
+
+DEFAULT_TTL = timedelta(days=90)
+
+# a venue Google could not resolve is asked about again after a week
+DEFAULT_NEGATIVE_TTL = timedelta(days=7)
+
+# stored for queries that could not be resolved
+NOT_FOUND = ""
+
+DEFAULT_MAX_ENTRIES = 10000
+
+# Google allows 50 requests per second per project; stay well below it.
+DEFAULT_RATE_LIMIT = 10
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def default_cache_file():
+    if os.environ.get("GEOCODE_CACHE"):
+        return os.environ["GEOCODE_CACHE"]
+    return os.path.join(cache_dir(), "geocode.sqlite")
+
+
+GEOCODERS = ["google", "record", "replay", "stub"]
+
+Location = namedtuple("Location", ["address"])
+
+
+def default_fixture_file():
+    return os.environ.get("GEOCODE_FIXTURE", "geocode-fixture.json")
+
+
+def google_geolocator():
+    from geopy.geocoders import GoogleV3
+
+    return GoogleV3(api_key=os.environ["MAPS_API_KEY"])
+
+
+def read_fixture(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+class ReplayGeolocator:
+    """Answer queries from a fixture saved by RecordingGeolocator."""
+
+    def __init__(self, path):
+        self.path = path
+        self.responses = read_fixture(path)
+
+    def geocode(self, query):
+        key = normalize_address(query)
+        if key not in self.responses:
+            logging.warning(f"{query!r} is not in {self.path}")
+            return None
+        address = self.responses[key]
+        return None if address is None else Location(address)
+
+
+class RecordingGeolocator:
+    """Pass queries to geolocator and save its answers to a fixture.
+
+    Answers are added to an existing fixture, which is rewritten after
+    each new answer so an interrupted run keeps what it recorded.
+    """
+
+    def __init__(self, geolocator, path):
+        self.geolocator = geolocator
+        self.path = path
+        self.lock = threading.Lock()
+        self.responses = read_fixture(path) if os.path.isfile(path) else {}
+
+    def geocode(self, query):
+        location = self.geolocator.geocode(query)
+        address = None if location is None else location.address
+        with self.lock:
+            self.responses[normalize_address(query)] = address
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as fh:
+                json.dump(self.responses, fh, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        return location
+
+
+class StubGeolocator:
+    """Local stand-in for GoogleV3 that answers without network."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def geocode(self, query):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return Location(f"{query.strip()}, USA")
+
+
+class RateLimiter:
+    """Space out calls from any number of threads to rate per second.
+
+    next_time is a multiprocessing.Value("d"); processes given the same
+    one share a single limit.
+    """
+
+    def __init__(self, rate, next_time=None):
+        from multiprocessing import Value
+
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = next_time if next_time is not None else Value("d")
+
+    def wait(self):
+        with self.next_time.get_lock():
+            now = time.monotonic()
+            delay = self.next_time.value - now
+            self.next_time.value = (
+                max(now, self.next_time.value) + self.interval
+            )
+        if delay > 0:
+            time.sleep(delay)
+
+
+# set in batch worker processes, so that they share one rate limit
+_shared_next_time = None
+
+
+def share_rate_limit(next_time):
+    """Count geocode requests of this process against next_time."""
+    global _shared_next_time
+    _shared_next_time = next_time
+
+
+class GeocodeCache:
+    """SQLite table of formatted addresses keyed by normalized query.
+
+    Queries that could not be resolved are stored as NOT_FOUND, which
+    expires after negative_ttl.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        ttl=DEFAULT_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        negative_ttl=DEFAULT_NEGATIVE_TTL,
+    ):
+        self.path = path or default_cache_file()
+        self.ttl = ttl.total_seconds()
+        self.negative_ttl = negative_ttl.total_seconds()
+        self.max_entries = max_entries
+        # batch runs share the cache file between worker processes
+        self.conn = connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY,"
+            " address TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS geocode_accessed"
+            " ON geocode (accessed)"
+        )
+        self.conn.commit()
+
+    def get(self, query):
+        key = normalize_address(query)
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT address, created FROM geocode WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        address, created = row
+        ttl = self.negative_ttl if address == NOT_FOUND else self.ttl
+        if now - created > ttl:
+            self.conn.execute("DELETE FROM geocode WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        self.conn.execute(
+            "UPDATE geocode SET accessed = ? WHERE key = ?", (now, key)
+        )
+        self.conn.commit()
+        return address
+
+    def put(self, query, address):
+        """Store address for query; None if it could not be resolved."""
+        if address is None:
+            address = NOT_FOUND
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)",
+            (normalize_address(query), address, now, now),
+        )
+        self.evict(now)
+        self.conn.commit()
+
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        self.conn.execute(
+            "DELETE FROM geocode WHERE created < ?"
+            " OR (address = ? AND created < ?)",
+            (now - self.ttl, NOT_FOUND, now - self.negative_ttl),
+        )
+        self.conn.execute(
+            "DELETE FROM geocode WHERE key IN ("
+            " SELECT key FROM geocode ORDER BY accessed DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedGeocoder:
+    """Geocoder that only calls the Maps API on a cache miss.
+
+    geocode() returns the formatted address string, or None when the
+    query could not be resolved.  The underlying geolocator is created
+    on the first miss, so a fully warm run needs neither network access
+    nor an API key.
+    """
+
+    def __init__(
+        self,
+        cache=None,
+        geolocator_factory=google_geolocator,
+        rate_limit=DEFAULT_RATE_LIMIT,
+    ):
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.geolocator_factory = geolocator_factory
+        self.rate_limit = rate_limit
+        self._geolocator = None
+        self._memo = {}
+        # lookups answered without calling the geolocator, and calls
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def geolocator(self):
+        if self._geolocator is None:
+            self._geolocator = self.geolocator_factory()
+        return self._geolocator
+
+    def geocode(self, query):
+        key = normalize_address(query)
+        if key in self._memo:
+            self.hits += 1
+            return self._memo[key]
+
+        address = self.cache.get(query)
+        if address is None:
+            logging.debug(f"Geocode cache miss {query=}")
+            self.misses += 1
+            location = self.geolocator.geocode(query)
+            if location is not None:
+                address = location.address
+            self.cache.put(query, address)
+        else:
+            logging.debug(f"Geocode cache hit {query=}")
+            self.hits += 1
+            address = address or None
+
+        self._memo[key] = address
+        return address
+
+    def geocode_many(
+        self,
+        queries,
+        max_workers=DEFAULT_MAX_WORKERS,
+        rate_limit=None,
+    ):
+        """Resolve unique queries, looking up cache misses concurrently.
+
+        Returns a dict mapping each query to its formatted address.
+        The SQLite cache is only touched from the calling thread.
+        """
+        results = {}
+        misses = {}
+        for query in queries:
+            key = normalize_address(query)
+            if key in self._memo:
+                self.hits += 1
+                results[query] = self._memo[key]
+                continue
+            address = self.cache.get(query)
+            if address is not None:
+                logging.debug(f"Geocode cache hit {query=}")
+                self.hits += 1
+                self._memo[key] = results[query] = address or None
+            else:
+                misses.setdefault(key, []).append(query)
+
+        self.misses += len(misses)
+        if not misses:
+            return results
+
+        logging.debug(f"Geocoding {len(misses)} addresses concurrently")
+        geolocator = self.geolocator
+        if rate_limit is None:
+            rate_limit = self.rate_limit
+        limiter = RateLimiter(rate_limit, _shared_next_time)
+
+        def lookup(query):
+            limiter.wait()
+            return geolocator.geocode(query)
+
+        first_queries = [group[0] for group in misses.values()]
+        workers = max(1, min(max_workers, len(first_queries)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            locations = list(executor.map(lookup, first_queries))
+
+        for (key, group), location in zip(misses.items(), locations):
+            address = None
+            if location is not None:
+                address = location.address
+            self.cache.put(group[0], address)
+            self._memo[key] = address
+            for query in group:
+                results[query] = address
+
+        return results
+
+
+def make_geocoder(backend=None, fixture=None):
+    """Return a CachedGeocoder for backend (default $GEOCODER)."""
+    backend = backend or os.environ.get("GEOCODER") or "google"
+    fixture = fixture or default_fixture_file()
+    if backend == "google":
+        return CachedGeocoder()
+    if backend == "record":
+
+        def factory():
+            return RecordingGeolocator(google_geolocator(), fixture)
+
+        rate_limit = DEFAULT_RATE_LIMIT
+    elif backend == "replay":
+
+        def factory():
+            return ReplayGeolocator(fixture)
+
+        rate_limit = 0
+    elif backend == "stub":
+        factory = StubGeolocator
+        rate_limit = 0
+    else:
+        raise ValueError(f"Unknown geocoder {backend!r}")
+    return CachedGeocoder(GeocodeCache(":memory:"), factory, rate_limit)
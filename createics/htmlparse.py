@@ -0,0 +1,64 @@
+"""HTML parsing helpers for the schedule page sources."""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def html_features():
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+def find_element_end(text, start, tag):
+    """Return the index just past the element of type tag at start."""
+    depth = 0
+    for match in re.finditer(rf"<(/?){tag}\b", text[start:], re.I):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            close = text.find(">", start + match.end())
+            return -1 if close < 0 else close + 1
+    return -1
+
+
+def extract_fragments(text, fragments):
+    """Cut the markup of each (start marker, tag) element out of text.
+
+    Returns None if any of the elements cannot be found.
+    """
+    parts = []
+    for marker, tag in fragments:
+        start = text.find(marker)
+        if start < 0:
+            return None
+        end = find_element_end(text, start, tag)
+        if end < 0:
+            return None
+        parts.append(text[start:end])
+    return "\n".join(parts)
+
+
+def parse_html(path, keep_tags=None, fragments=None):
+    """Parse path into a BeautifulSoup tree.
+
+    With neither keep_tags nor fragments the whole page is parsed with
+    html.parser.  Otherwise only the given fragments are parsed, falling
+    back to restricting the tree to the keep_tags elements (and
+    everything inside them) if a fragment is missing from the page.
+    """
+    with open(path) as fh:
+        if keep_tags is None and fragments is None:
+            return BeautifulSoup(fh, "html.parser")
+        text = fh.read()
+
+    if fragments:
+        markup = extract_fragments(text, fragments)
+        if markup is not None:
+            return BeautifulSoup(markup, html_features())
+
+    return BeautifulSoup(
+        text, html_features(), parse_only=SoupStrainer(keep_tags)
+    )
@@ -0,0 +1,153 @@
+"""Streaming iCalendar writer.
+
+Events are serialized one at a time straight to the output file, so
+memory use does not grow with the size of the calendar.
+"""
+
+from contextlib import contextmanager
+from datetime import timedelta, timezone
+import os
+
+
+CRLF = b"\r\n"
+
+MAX_LINE_OCTETS = 75
+
+UTC_ZONES = {"UTC", "Etc/UTC", "GMT", "Z"}
+
+# bump whenever format_event() writes different bytes for the same
+# fields, so blocks cached by an older writer are not reused
+FORMAT_VERSION = 1
+
+
+def escape_text(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line):
+    """Encode a content line, folding it at 75 octets (RFC 5545 3.1)."""
+    data = line.encode("utf-8")
+    if len(data) <= MAX_LINE_OCTETS:
+        return data + CRLF
+
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        # never split a multi-byte utf-8 sequence
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start = end
+        # continuation lines begin with a space
+        limit = MAX_LINE_OCTETS - 1
+    parts.append(data[start:])
+    return (CRLF + b" ").join(parts) + CRLF
+
+
+def tzid(dt):
+    tzinfo = dt.tzinfo
+    return getattr(tzinfo, "zone", None) or getattr(tzinfo, "key", None)
+
+
+def format_datetime(name, dt):
+    if dt.tzinfo is None:
+        return f"{name}:{dt:%Y%m%dT%H%M%S}"
+    zone = tzid(dt)
+    if zone is None or zone in UTC_ZONES:
+        if zone is None and dt.utcoffset() != timedelta(0):
+            dt = dt.astimezone(timezone.utc)
+        return f"{name}:{dt:%Y%m%dT%H%M%S}Z"
+    return f"{name};TZID={zone}:{dt:%Y%m%dT%H%M%S}"
+
+
+def format_event(
+    uid,
+    summary,
+    dtstart,
+    dtend,
+    location=None,
+    description=None,
+    sequence=None,
+    status=None,
+):
+    """Serialize one VEVENT as CRLF-terminated bytes."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"SUMMARY:{escape_text(summary)}",
+        format_datetime("DTSTART", dtstart),
+        format_datetime("DTEND", dtend),
+        f"UID:{escape_text(uid)}",
+    ]
+    if sequence:
+        lines.append(f"SEQUENCE:{sequence}")
+    if description is not None:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+    if location is not None:
+        lines.append(f"LOCATION:{escape_text(location)}")
+    if status is not None:
+        lines.append(f"STATUS:{status}")
+    lines.append("END:VEVENT")
+    return b"".join(fold_line(line) for line in lines)
+
+
+class IcsWriter:
+    """Write a VCALENDAR to a binary file object as events arrive."""
+
+    def __init__(self, fh, prodid, version="2.0", event_cache=None):
+        self.fh = fh
+        self.prodid = prodid
+        self.version = version
+        self.event_cache = event_cache
+        self.count = 0
+
+    def __enter__(self):
+        self.write_header()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.write_footer()
+
+    def write_header(self):
+        self.fh.write(fold_line("BEGIN:VCALENDAR"))
+        self.fh.write(fold_line(f"VERSION:{self.version}"))
+        self.fh.write(fold_line(f"PRODID:{escape_text(self.prodid)}"))
+
+    def write_footer(self):
+        self.fh.write(fold_line("END:VCALENDAR"))
+
+    def write_block(self, block):
+        self.fh.write(block)
+        self.count += 1
+
+    def format_event(self, **fields):
+        if self.event_cache is None:
+            return format_event(**fields)
+        return self.event_cache.format_event(**fields)
+
+    def write_event(self, **fields):
+        self.write_block(self.format_event(**fields))
+
+
+@contextmanager
+def open_calendar(path, prodid, event_cache=None):
+    """Stream a calendar to path, replacing it only once complete."""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as fh, IcsWriter(
+            fh, prodid, event_cache=event_cache
+        ) as writer:
+            yield writer
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,160 @@
+"""Incremental calendar regeneration.
+
+An existing .ics file is indexed by UID and compared with the freshly
+generated events.  Unchanged events are copied over byte for byte,
+changed events get their SEQUENCE bumped, and events that disappeared
+from the source are kept as STATUS:CANCELLED so subscribed clients
+drop them.  When nothing changed the file is left untouched.
+"""
+
+from contextlib import contextmanager
+import logging
+import os
+
+from createics.icswriter import (
+    CRLF,
+    escape_text,
+    fold_line,
+    open_calendar,
+)
+
+
+class StoredEvent:
+    """A VEVENT block of the previous calendar.
+
+    Only the raw block and the properties compared against are kept;
+    its lines are unfolded again if the event has to be cancelled.
+    """
+
+    __slots__ = ("block", "uid", "sequence", "cancelled")
+
+    def __init__(self, block):
+        self.block = block
+        self.uid = None
+        self.sequence = 0
+        self.cancelled = False
+        for line in unfold(block):
+            name, _, value = line.partition(":")
+            if name == "UID":
+                self.uid = value
+            elif name == "SEQUENCE":
+                self.sequence = int(value)
+            elif name == "STATUS":
+                self.cancelled = value == "CANCELLED"
+
+    def cancel(self):
+        lines = []
+        for line in unfold(self.block):
+            name = line.partition(":")[0]
+            if name in ("SEQUENCE", "STATUS", "END"):
+                continue
+            lines.append(line)
+            if name == "UID":
+                lines.append(f"SEQUENCE:{self.sequence + 1}")
+        lines.append("STATUS:CANCELLED")
+        lines.append("END:VEVENT")
+        return b"".join(fold_line(line) for line in lines)
+
+
+def unfold(block):
+    return (
+        block.decode("utf-8")
+        .replace("\r\n ", "")
+        .replace("\r\n\t", "")
+        .split("\r\n")[:-1]
+    )
+
+
+def read_events(path):
+    """Return the VEVENT blocks of an ics file indexed by UID."""
+    events = {}
+    if not os.path.isfile(path):
+        return events
+
+    block = None
+    with open(path, "rb") as fh:
+        for line in fh:
+            if not line.endswith(CRLF):
+                line = line.rstrip(b"\r\n") + CRLF
+            if line == b"BEGIN:VEVENT" + CRLF:
+                block = []
+            if block is not None:
+                block.append(line)
+            if line == b"END:VEVENT" + CRLF and block is not None:
+                event = StoredEvent(b"".join(block))
+                if event.uid is not None:
+                    events[event.uid] = event
+                block = None
+    return events
+
+
+class IncrementalWriter:
+    """Drop-in for IcsWriter that reuses the blocks of a previous run."""
+
+    def __init__(self, writer, previous):
+        self.writer = writer
+        self.previous = previous
+        self.seen = set()
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.cancelled = 0
+
+    @property
+    def count(self):
+        return self.writer.count
+
+    @property
+    def modified(self):
+        return bool(self.new or self.changed or self.cancelled)
+
+    def write_event(self, **fields):
+        uid = escape_text(fields["uid"])
+        self.seen.add(uid)
+        old = self.previous.get(uid)
+        if old is None:
+            self.new += 1
+            self.writer.write_event(**fields)
+            return
+
+        block = self.writer.format_event(sequence=old.sequence, **fields)
+        if block == old.block:
+            self.unchanged += 1
+        else:
+            self.changed += 1
+            block = self.writer.format_event(
+                sequence=old.sequence + 1, **fields
+            )
+        self.writer.write_block(block)
+
+    def write_cancelled(self):
+        for uid, old in self.previous.items():
+            if uid in self.seen:
+                continue
+            if old.cancelled:
+                self.writer.write_block(old.block)
+            else:
+                self.cancelled += 1
+                self.writer.write_block(old.cancel())
+
+
+@contextmanager
+def open_incremental_calendar(path, prodid, event_cache=None):
+    """Like open_calendar() but only rewrites path if events changed."""
+    previous = read_events(path)
+    tmp_path = f"{path}.new"
+    try:
+        with open_calendar(tmp_path, prodid, event_cache) as writer:
+            cal = IncrementalWriter(writer, previous)
+            yield cal
+            cal.write_cancelled()
+
+        logging.info(
+            f"{path}: {cal.new} new, {cal.changed} changed,"
+            f" {cal.cancelled} cancelled, {cal.unchanged} unchanged events"
+        )
+        if cal.modified or not os.path.isfile(path):
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
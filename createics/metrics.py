@@ -0,0 +1,165 @@
+"""Stage timings and counters for monitoring calendar builds.
+
+A Metrics object records the wall time spent in each stage and counts
+rows, cache hits and filtered rows.  Stage times are exclusive: time
+spent in a nested stage (geocoding while building events) is charged
+to that stage only, so the stages add up to the whole run.
+
+Sources and the pipeline always talk to a metrics object.  When
+metrics are not requested it is NULL_METRICS, whose methods do
+nothing, so instrumentation costs next to nothing when disabled.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+import os
+import time
+
+
+FORMATS = ["json", "prometheus"]
+
+_NULL_CONTEXT = nullcontext()
+
+
+class NullMetrics:
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self, job):
+        self.job = job
+        self.started = time.time()
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            self.stages[name] += elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def iterate(self, name, iterable):
+        """Yield from iterable, charging the time to produce items."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def snapshot(self):
+        return {
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, snapshot):
+        for name, seconds in snapshot["stages"].items():
+            self.stages[name] += seconds
+        for name, n in snapshot["counters"].items():
+            self.counters[name] += n
+
+    def to_json(self):
+        import json
+
+        return json.dumps(
+            {
+                "job": self.job,
+                "timestamp": self.started,
+                "duration_seconds": time.time() - self.started,
+                **self.snapshot(),
+            },
+            indent=2,
+            sort_keys=True,
+        )
+
+    def to_prometheus(self, prefix="createics"):
+        job = self.job.replace("\\", "\\\\").replace('"', '\\"')
+        lines = [
+            f"# HELP {prefix}_stage_seconds Wall time spent in each stage.",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        for name, seconds in sorted(self.stages.items()):
+            lines.append(
+                f'{prefix}_stage_seconds{{job="{job}",stage="{name}"}}'
+                f" {seconds:.6f}"
+            )
+        for name, n in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f'{prefix}_{name}{{job="{job}"}} {n}')
+        lines.append(f"# TYPE {prefix}_duration_seconds gauge")
+        lines.append(
+            f'{prefix}_duration_seconds{{job="{job}"}}'
+            f" {time.time() - self.started:.6f}"
+        )
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(
+            f'{prefix}_last_run_timestamp_seconds{{job="{job}"}}'
+            f" {self.started:.0f}"
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, format="json"):
+        """Write the metrics to path, or stdout for "-".
+
+        The file is replaced in one step, as the node exporter's
+        textfile collector expects.
+        """
+        if format == "prometheus":
+            text = self.to_prometheus()
+        else:
+            text = self.to_json() + "\n"
+        if path == "-":
+            print(text, end="")
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as fh:
+            fh.write(text)
+        os.replace(tmp_path, path)
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Write stage timings and counters to FILE (- for stdout)",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=FORMATS,
+        default="json",
+        help="Format of the --metrics file",
+    )
+
+
+def metrics_from_args(args, job):
+    if args.metrics is None:
+        return NULL_METRICS
+    return Metrics(job)
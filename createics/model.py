@@ -0,0 +1,47 @@
+"""Event model shared by every schedule source.
+
+Sources yield one CalendarEvent per row and the pipeline turns it into
+iCalendar text as it is written, so events are never all held at once.
+The class has slots, as a check-in history can run to tens of
+thousands of rows.
+"""
+
+
+class CalendarEvent:
+    __slots__ = (
+        "uid",
+        "summary",
+        "dtstart",
+        "dtend",
+        "location",
+        "description",
+    )
+
+    def __init__(
+        self,
+        uid,
+        summary,
+        dtstart,
+        dtend,
+        location=None,
+        description=None,
+    ):
+        self.uid = uid
+        self.summary = summary
+        self.dtstart = dtstart
+        self.dtend = dtend
+        self.location = location
+        self.description = description
+
+    def __repr__(self):
+        return f"CalendarEvent({self.uid!r}, {self.summary!r})"
+
+    def fields(self):
+        return {
+            "uid": self.uid,
+            "summary": self.summary,
+            "dtstart": self.dtstart,
+            "dtend": self.dtend,
+            "location": self.location,
+            "description": self.description,
+        }
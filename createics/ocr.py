@@ -0,0 +1,157 @@
+"""OCR of check-in screenshots exported from the gym app as a pdf.
+
+Each page is rasterized with ghostscript and recognized with tesseract
+in its own pair of processes, several pages at a time.  Page images and
+text only ever live in pipes and memory.
+
+Recognized text is cached by a hash of the rendered page, so pages
+that were already seen in an earlier export skip tesseract.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+
+from createics.paths import cache_dir, connect
+
+
+DEFAULT_DPI = 300
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class OcrCache:
+    """SQLite table of page text keyed by page image hash.
+
+    Least recently used pages are evicted once the stored text exceeds
+    max_bytes.  Safe to share between the OCR worker threads.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.path.join(cache_dir(), "ocr.sqlite")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT text FROM ocr WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE ocr SET accessed = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, text):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)",
+                (key, text, len(text.encode("utf-8")), time.time()),
+            )
+            self.conn.execute(
+                "DELETE FROM ocr WHERE key IN ("
+                " SELECT key FROM ("
+                "  SELECT key, SUM(size) OVER (ORDER BY accessed DESC)"
+                "  AS total FROM ocr)"
+                " WHERE total > ?)",
+                (self.max_bytes,),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def page_count(pdf_file):
+    output = subprocess.run(
+        ["pdfinfo", pdf_file], capture_output=True, check=True, text=True
+    ).stdout
+    return int(re.search(r"^Pages:\s+(\d+)", output, re.M).group(1))
+
+
+def render_page(pdf_file, page_number, dpi=DEFAULT_DPI):
+    """Return one page rendered as a grayscale png."""
+    return subprocess.run(
+        [
+            "gs",
+            "-q",
+            "-dNOPAUSE",
+            "-dBATCH",
+            "-dSAFER",
+            f"-r{dpi}",
+            "-sDEVICE=pnggray",
+            f"-dFirstPage={page_number}",
+            f"-dLastPage={page_number}",
+            "-sOutputFile=-",
+            pdf_file,
+        ],
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+def recognize(image):
+    return subprocess.run(
+        ["tesseract", "stdin", "stdout"],
+        input=image,
+        capture_output=True,
+        check=True,
+    ).stdout.decode("utf-8")
+
+
+def ocr_page(pdf_file, page_number, dpi=DEFAULT_DPI, cache=None):
+    image = render_page(pdf_file, page_number, dpi)
+    if cache is None:
+        return recognize(image)
+
+    key = hashlib.sha256(image).hexdigest()
+    text = cache.get(key)
+    if text is None:
+        text = recognize(image)
+        cache.put(key, text)
+    else:
+        logging.debug(f"OCR cache hit for page {page_number}")
+    return text
+
+
+def fix_line(line):
+    # tesseract reads the slash in dates like "2/14" as a 1
+    return re.sub(r"^([2-9])1", r"\1/", line)
+
+
+def ocr_lines(pdf_file, workers=None, dpi=DEFAULT_DPI, cache=None):
+    """Yield the non-empty recognized lines of pdf_file in page order.
+
+    gs and tesseract are separate processes, so a thread pool is enough
+    to keep several pages going at once.
+    """
+    pages = range(1, page_count(pdf_file) + 1)
+    workers = workers or os.cpu_count()
+
+    def ocr(page_number):
+        return ocr_page(pdf_file, page_number, dpi, cache)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        texts = executor.map(ocr, pages)
+        for text in texts:
+            for line in text.splitlines():
+                if line.strip():
+                    yield fix_line(line)
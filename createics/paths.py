@@ -0,0 +1,33 @@
+"""Locations of files shared between runs."""
+
+import os
+import sqlite3
+
+
+def cache_dir():
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "create-ics")
+
+
+def data_dir():
+    data_home = os.environ.get(
+        "XDG_DATA_HOME",
+        os.path.join(os.path.expanduser("~"), ".local", "share"),
+    )
+    return os.path.join(data_home, "create-ics")
+
+
+def connect(path, **kwargs):
+    """Open the SQLite database at path, creating its directory.
+
+    File databases use write-ahead logging, so that the processes of a
+    batch run can share them.
+    """
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, **kwargs)
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+    return conn
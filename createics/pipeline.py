@@ -0,0 +1,122 @@
+"""Output pipeline shared by the calendar scripts.
+
+A Pipeline owns the objects that are expensive to set up (geocoder,
+geocode cache, timezones) so that many schedules can be built in one
+process.  They are imported on first use, so a script that exits early
+never loads them.
+"""
+
+import logging
+import os
+import sys
+
+from createics.metrics import NULL_METRICS
+
+
+def change_ext(filename, new_ext):
+    basename, ext = os.path.splitext(filename)
+    return f"{basename}{new_ext}"
+
+
+def add_event_cache_argument(parser):
+    parser.add_argument(
+        "--event-cache",
+        action="store_true",
+        help="Reuse events formatted by the last run if unchanged",
+    )
+
+
+class Pipeline:
+    def __init__(self, geocoder=None, cache_events=False, metrics=None):
+        self._geocoder = geocoder
+        self._owns_geocoder = False
+        self._timezones = {}
+        self.cache_events = cache_events
+        self.metrics = metrics or NULL_METRICS
+
+    @property
+    def geocoder(self):
+        if self._geocoder is None:
+            from createics.geocache import make_geocoder
+
+            self._geocoder = make_geocoder()
+            self._owns_geocoder = True
+        return self._geocoder
+
+    def timezone(self, name=None):
+        if name not in self._timezones:
+            import pytz
+
+            zone_name = name
+            if zone_name is None:
+                import tzlocal
+
+                zone_name = tzlocal.get_localzone_name()
+            self._timezones[name] = pytz.timezone(zone_name)
+        return self._timezones[name]
+
+    def close(self):
+        """Close the geocode cache, if this pipeline opened it."""
+        if self._owns_geocoder:
+            self._geocoder.cache.close()
+            self._geocoder = None
+            self._owns_geocoder = False
+
+    def open_output(
+        self, prodid, ics_file=None, incremental=False, event_cache=None
+    ):
+        from createics.icswriter import IcsWriter, open_calendar
+        from createics.incremental import open_incremental_calendar
+
+        if ics_file is None:
+            return IcsWriter(sys.stdout.buffer, prodid)
+        if incremental:
+            return open_incremental_calendar(ics_file, prodid, event_cache)
+        return open_calendar(ics_file, prodid, event_cache)
+
+    def geocode_counts(self):
+        hits = getattr(self._geocoder, "hits", 0)
+        misses = getattr(self._geocoder, "misses", 0)
+        return hits, misses
+
+    def build(self, source, ics_file=None, incremental=False):
+        """Write the calendar for source and return its event count."""
+        metrics = self.metrics
+        source.metrics = metrics
+        hits, misses = self.geocode_counts()
+
+        with metrics.stage("load"):
+            source.load()
+        event_cache = None
+        if self.cache_events and ics_file is not None:
+            from createics.eventcache import EventCache
+
+            event_cache = EventCache(ics_file)
+        try:
+            with metrics.stage("write"):
+                output = self.open_output(
+                    source.prodid, ics_file, incremental, event_cache
+                )
+                with output as cal:
+                    for event in metrics.iterate("build", source.events(self)):
+                        with metrics.stage("serialize"):
+                            cal.write_event(**event.fields())
+                if event_cache is not None:
+                    event_cache.save()
+        finally:
+            if event_cache is not None:
+                event_cache.close()
+
+        logging.debug(f"{source.name}: wrote {cal.count} events")
+        if metrics.enabled:
+            metrics.count("events", cal.count)
+            new_hits, new_misses = self.geocode_counts()
+            metrics.count("geocode_cache_hits", new_hits - hits)
+            metrics.count("geocode_cache_misses", new_misses - misses)
+            if event_cache is not None:
+                metrics.count("event_cache_hits", event_cache.hits)
+                metrics.count("event_cache_misses", event_cache.misses)
+            for name in ("new", "changed", "cancelled", "unchanged"):
+                if hasattr(cal, name):
+                    metrics.count(f"events_{name}", getattr(cal, name))
+        return cal.count
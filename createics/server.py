@@ -0,0 +1,177 @@
+"""Serve calendar feeds over HTTP to polling calendar clients.
+
+Each feed is rebuilt only when its input file has changed since the
+last build, and the encoded response is kept in memory until then.
+Clients revalidate with ETag or Last-Modified and get a 304 with no
+body when nothing changed, so a poll costs one stat() and a header
+comparison.
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+from createics.batch import make_source
+from createics.pipeline import Pipeline
+
+
+class Feed:
+    """One calendar served at /name, built from a batch job."""
+
+    def __init__(self, job, fast_html=False, cache_events=False):
+        self.job = job
+        self.fast_html = fast_html
+        self.cache_events = cache_events
+        self.name = os.path.basename(job[2])
+        self.lock = threading.Lock()
+        self.input_stat = None
+        self.ics_mtime = None
+        self.body = None
+        self.gzip_body = None
+        self.etag = None
+        self.last_modified = None
+
+    def stale(self, input_stat):
+        ics_file = self.job[2]
+        if not os.path.exists(ics_file):
+            return True
+        if self.input_stat is None:
+            # first request: trust an output newer than its input
+            return os.path.getmtime(ics_file) < input_stat.st_mtime
+        return (input_stat.st_mtime_ns, input_stat.st_size) != (
+            self.input_stat.st_mtime_ns,
+            self.input_stat.st_size,
+        )
+
+    def refresh(self):
+        """Rebuild the calendar if its input changed; reload if needed."""
+        source_name, input_file, ics_file = self.job
+        with self.lock:
+            input_stat = os.stat(input_file)
+            if self.stale(input_stat):
+                logging.info(f"Rebuilding {ics_file} from {input_file}")
+                # a fresh pipeline, as sqlite caches are per thread
+                source = make_source(self.job, self.fast_html)
+                pipeline = Pipeline(cache_events=self.cache_events)
+                try:
+                    pipeline.build(source, ics_file)
+                finally:
+                    pipeline.close()
+            self.input_stat = input_stat
+
+            # a rebuild with the same events keeps the same entity tag
+            ics_mtime = os.stat(ics_file).st_mtime_ns
+            if ics_mtime != self.ics_mtime:
+                self.load(ics_file)
+                self.ics_mtime = ics_mtime
+            return self.body, self.gzip_body, self.etag, self.last_modified
+
+    def load(self, ics_file):
+        with open(ics_file, "rb") as fh:
+            body = fh.read()
+        # the calendar has no timestamps, so equal events give equal bytes
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        if etag != self.etag:
+            self.body = body
+            self.gzip_body = gzip.compress(body, mtime=0)
+            self.etag = etag
+            self.last_modified = int(os.path.getmtime(ics_file))
+
+
+def not_modified(headers, etag, last_modified):
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since.timestamp() >= last_modified
+    return False
+
+
+def accepts_gzip(headers):
+    for coding in headers.get("Accept-Encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.replace(" ", "").removeprefix("q=")
+            try:
+                return float(quality or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def do_HEAD(self):
+        self.do_GET(send_body=False)
+
+    def do_GET(self, send_body=True):
+        feed = self.server.feeds.get(self.path.split("?")[0].lstrip("/"))
+        if feed is None:
+            self.send_error(404)
+            return
+        try:
+            body, gzip_body, etag, last_modified = feed.refresh()
+        except Exception as e:
+            logging.error(f"{feed.name}: {e}")
+            if feed.body is None:
+                self.send_error(500)
+                return
+            # keep serving the last good calendar
+            body, gzip_body = feed.body, feed.gzip_body
+            etag, last_modified = feed.etag, feed.last_modified
+
+        use_gzip = accepts_gzip(self.headers)
+        if use_gzip:
+            # each encoding of the calendar needs its own entity tag
+            body = gzip_body
+            etag = f'{etag[:-1]}-gzip"'
+
+        if not_modified(self.headers, etag, last_modified):
+            self.send_response(304)
+            self.send_validators(etag, last_modified)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_validators(etag, last_modified)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_validators(self, etag, last_modified):
+        self.send_header("ETag", etag)
+        self.send_header(
+            "Last-Modified", formatdate(last_modified, usegmt=True)
+        )
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Cache-Control", "no-cache")
+
+
+def make_server(
+    jobs, host="127.0.0.1", port=8080, fast_html=False, cache_events=False
+):
+    feeds = {}
+    for job in jobs:
+        feed = Feed(job, fast_html, cache_events)
+        if feed.name in feeds:
+            raise ValueError(f"Two feeds would be served as /{feed.name}")
+        feeds[feed.name] = feed
+    server = ThreadingHTTPServer((host, port), FeedHandler)
+    server.feeds = feeds
+    return server
@@ -0,0 +1,90 @@
+"""Pluggable schedule sources.
+
+A source turns one input document (schedule page, check-in report)
+into CalendarEvent objects.  Sources are registered by name and only
+imported when requested, so a script pays for bs4 or pandas only when
+it uses a source that needs them.
+"""
+
+from importlib import import_module
+
+from createics.metrics import NULL_METRICS
+
+
+SOURCES = {
+    "athletics": "createics.sources.athletics:AthleticsSource",
+    "varsity": "createics.sources.athletics:VarsitySource",
+    "maxpreps": "createics.sources.maxpreps:MaxPrepsSource",
+    "club-visits": "createics.sources.checkins:ClubVisitsSource",
+    "club-visits-merged": "createics.sources.checkins:"
+    "MergedClubVisitsSource",
+    "gym-checkins": "createics.sources.checkins:GymCheckinsSource",
+}
+
+
+def get_source(name):
+    module_name, _, class_name = SOURCES[name].partition(":")
+    return getattr(import_module(module_name), class_name)
+
+
+class ScheduleSource:
+    """Base class for schedule sources.
+
+    load() parses the input; events(pipeline) then yields CalendarEvent
+    objects, using the pipeline for geocoding and timezones.  The
+    pipeline sets metrics before load() for the source to time its
+    parse, dates and geocode stages and count the rows it reads and
+    drops.
+    """
+
+    name = None
+    product = None
+    calendar_name = None
+    date_formats = None
+    metrics = NULL_METRICS
+
+    _date_parser = None
+
+    @property
+    def prodid(self):
+        return f"-//{self.product}//{self.calendar_name}//EN"
+
+    @property
+    def date_parser(self):
+        if self._date_parser is None:
+            from createics.dates import DEFAULT_FORMATS, DateParser
+
+            self._date_parser = DateParser(
+                self.date_formats or DEFAULT_FORMATS
+            )
+        return self._date_parser
+
+    def load(self):
+        pass
+
+    def events(self, pipeline):
+        raise NotImplementedError
+
+
+class HtmlScheduleSource(ScheduleSource):
+    """Source parsed from an html page.
+
+    With fast_html the page is parsed with lxml (when installed) and
+    only the fragments elements, or failing that the keep_tags
+    elements, are built into the tree.
+    """
+
+    keep_tags = None
+    fragments = None
+
+    def __init__(self, html_file, fast_html=False):
+        self.html_file = html_file
+        self.fast_html = fast_html
+
+    def parse_html(self):
+        from createics.htmlparse import parse_html
+
+        with self.metrics.stage("parse"):
+            if not self.fast_html:
+                return parse_html(self.html_file)
+            return parse_html(self.html_file, self.keep_tags, self.fragments)
@@ -0,0 +1,267 @@
+"""Team schedule pages from the school athletics site."""
+
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+import logging
+import re
+
+from createics.dates import (
+    PLACEHOLDER_YEAR,
+    YearRollover,
+    season_start_year,
+    with_year,
+)
+from createics.model import CalendarEvent
+from createics.sources import HtmlScheduleSource
+
+
+def map_query(link):
+    return parse_qs(urlparse(link["href"]).query)["q"][0]
+
+
+class AthleticsSource(HtmlScheduleSource):
+    name = "athletics"
+    product = "bball-sched"
+    home_venue = "Zambetti"
+    title_suffix = "High School Basketball"
+    duration = timedelta(hours=1, minutes=30)
+    timezone_name = None
+    keep_tags = ["meta", "span", "p", "table"]
+
+    def __init__(
+        self,
+        html_file,
+        fast_html=False,
+        geocode_workers=8,
+        geocode_rate=None,
+        today=None,
+    ):
+        super().__init__(html_file, fast_html)
+        self.geocode_workers = geocode_workers
+        self.geocode_rate = geocode_rate
+        self.today = today
+
+    def load(self):
+        soup = self.parse_html()
+
+        self.calendar_name = self.team_name = soup.find(
+            "meta", {"property": "og:site_name"}
+        )["content"]
+        logging.debug(f"team_name={self.team_name!r}")
+
+        address_lines = (
+            soup.find(
+                "span",
+                class_="site-nav-address--title",
+                string="Middle & Upper School",
+            )
+            .find_next_sibling("p")
+            .get_text()
+            .split("\n")[1:]
+        )
+        self.home_address = ", ".join([line.strip() for line in address_lines])
+        logging.debug(f"home_address={self.home_address!r}")
+
+        schedule_table = soup.find(
+            "table", class_=re.compile("athletics-event-table")
+        ).tbody
+        self.games = list(self.parse_games(schedule_table))
+
+    def parse_games(self, schedule_table):
+        # only format the per-row debug output when it will be shown
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        for tr in schedule_table.find_all("tr"):
+            tds = tr.find_all("td")
+            day, date, time, location, game_type, opponent = [
+                td.get_text().strip() for td in tds
+            ]
+            self.metrics.count("rows")
+
+            address = None
+            map_link = tds[3].find("a")
+            if map_link:
+                address = map_query(map_link)
+
+            if debug:
+                logging.debug(f"----------")
+                logging.debug(f"{day=}")
+                logging.debug(f"{date=}")
+                logging.debug(f"{time=}")
+                logging.debug(f"{location=}")
+                logging.debug(f"{game_type=}")
+                logging.debug(f"{opponent=}")
+                logging.debug(f"{address=}")
+
+            if not self.is_game(day, game_type):
+                self.metrics.count("dropped_not_game")
+                continue
+
+            yield date, time, location, game_type, opponent, address
+
+    def is_game(self, day, game_type):
+        return game_type in ["Game", "Scrimmage"] or "game day" in day.lower()
+
+    def is_home(self, location):
+        return self.home_venue in location
+
+    def title(self, opponent, home, game_type):
+        if home:
+            title = f"{opponent} vs. {self.team_name}"
+        else:
+            title = f"{self.team_name} vs. {opponent}"
+        return f"{title} {self.title_suffix} {game_type.title()}"
+
+    def start_times(self, local_timezone):
+        """Return the start time of every game, in table order.
+
+        Each row is parsed once without a year.  The years come from
+        where the schedule crosses into January, with the season placed
+        so that it has not already ended.
+        """
+        rollover = YearRollover()
+        dated = []
+        for date, time, *_ in self.games:
+            start_time = self.date_parser.parse(
+                f"{date}, {PLACEHOLDER_YEAR} {time}"
+            )
+            dated.append((rollover.offset(start_time), start_time))
+        if not dated:
+            return []
+        year = season_start_year(dated, self.today or datetime.now())
+        return [
+            local_timezone.localize(with_year(start_time, year + offset))
+            for offset, start_time in dated
+        ]
+
+    def uid(self, start_time):
+        return (
+            start_time.strftime("%Y%m%d%I%M%p%Z")
+            + "@"
+            + self.team_name.replace(" ", "")
+        )
+
+    def events(self, pipeline):
+        # Every venue is geocoded in one concurrent batch before any
+        # events are built.
+        venues = {
+            address
+            for _, _, location, _, _, address in self.games
+            if address and not self.is_home(location)
+        }
+        if self.home_address:
+            venues.add(self.home_address)
+        with self.metrics.stage("geocode"):
+            geocoded = pipeline.geocoder.geocode_many(
+                venues,
+                max_workers=self.geocode_workers,
+                rate_limit=self.geocode_rate,
+            )
+
+        team_address = geocoded.get(self.home_address)
+        logging.debug(f"{team_address=}")
+
+        local_timezone = pipeline.timezone(self.timezone_name)
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+        with self.metrics.stage("dates"):
+            start_times = self.start_times(local_timezone)
+
+        for game, start_time in zip(self.games, start_times):
+            _, _, location, game_type, opponent, address = game
+            home = self.is_home(location)
+            if home:
+                ev_location = team_address or location
+            elif address:
+                ev_location = geocoded[address] or location
+            else:
+                ev_location = location
+
+            title = self.title(opponent, home, game_type)
+
+            end_time = start_time + self.duration
+
+            if debug:
+                logging.debug(f"{title=}")
+                logging.debug(f"{ev_location=}")
+                logging.debug(start_time.strftime("%Y-%m-%d %I:%M %p"))
+                logging.debug(
+                    start_time.astimezone().strftime("%Y-%m-%d %I:%M %p")
+                )
+                logging.debug(
+                    end_time.astimezone().strftime("%Y-%m-%d %I:%M %p")
+                )
+
+            yield CalendarEvent(
+                uid=self.uid(start_time),
+                summary=title,
+                description=title,
+                dtstart=start_time,
+                dtend=end_time,
+                location=ev_location,
+            )
+
+
+class VarsitySource(AthleticsSource):
+    """Saved copy of the boys varsity page, as used by schedule.py."""
+
+    name = "varsity"
+    product = "schedule"
+    home_venue = "Marc A. Zambetti"
+    title_suffix = "Boys Varsity Basketball"
+    duration = timedelta(hours=2)
+    timezone_name = "America/New_York"
+
+    keep_tags = ["meta", "tbody"]
+
+    cols = ["day", "date", "time", "location", "type", "opponent"]
+
+    def load(self):
+        soup = self.parse_html()
+
+        self.team_name = soup.find("meta", {"property": "og:site_name"})[
+            "content"
+        ].split()[0]
+        self.calendar_name = self.team_name
+        self.home_address = None
+
+        self.games = list(self.parse_games(soup.find("tbody")))
+
+    def parse_games(self, schedule_table):
+        for tr in schedule_table.find_all("tr", recursive=False):
+            td = tr.find_all("td", recursive=False)
+
+            fields = {}
+            for idx, col_name in enumerate(self.cols):
+                fields[col_name] = td[idx].get_text().strip()
+            self.metrics.count("rows")
+
+            if fields["type"] != "Game":
+                self.metrics.count("dropped_not_game")
+                continue
+
+            address = None
+            maps_link = td[3].find("a", href=True, string=fields["location"])
+            if maps_link:
+                address = map_query(maps_link)
+
+            yield (
+                fields["date"],
+                fields["time"],
+                fields["location"],
+                fields["type"],
+                fields["opponent"],
+                address,
+            )
+
+    def is_home(self, location):
+        return location.startswith(self.home_venue)
+
+    def title(self, opponent, home, game_type):
+        if home:
+            title = f"{opponent} vs. {self.team_name}"
+        else:
+            title = f"{self.team_name} vs. {opponent}"
+        return f"{title} {self.title_suffix} Game"
+
+    def uid(self, start_time):
+        return start_time.strftime("%Y%m%d%H%M") + "@" + self.team_name
@@ -0,0 +1,443 @@
+"""Fitness club check-in histories."""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+import re
+import warnings
+
+from createics.dates import (
+    PLACEHOLDER_YEAR,
+    YearRollover,
+    log_start_year,
+    with_year,
+)
+from createics.model import CalendarEvent
+from createics.sources import ScheduleSource
+
+
+class ClubVisitsSource(ScheduleSource):
+    """Club Visits pdf report downloaded by download-pdf.py."""
+
+    name = "club-visits"
+    product = "rrasch"
+    calendar_name = "ClubCheckinCalendar"
+    timezone_name = "America/New_York"
+    duration = timedelta(hours=2)
+    min_interval = timedelta(hours=2)
+
+    backends = ["tabula", "pdfplumber"]
+
+    def __init__(self, pdf_file, backend="tabula"):
+        if backend not in self.backends:
+            raise ValueError(f"Unknown pdf backend {backend!r}")
+        self.pdf_file = pdf_file
+        self.backend = backend
+
+    @property
+    def prodid(self):
+        return f"-//{self.product}/{self.calendar_name}//EN"
+
+    def load(self):
+        import pandas as pd
+
+        pd.set_option(
+            "display.max_columns",
+            None,
+            "display.max_rows",
+            None,
+            "display.width",
+            0,
+        )
+
+        with self.metrics.stage("parse"):
+            if self.backend == "pdfplumber":
+                self.tables = self.read_tables_pdfplumber()
+            else:
+                self.tables = self.read_tables_tabula()
+
+        # remove row with column names
+        self.tables[0].drop(index=0, inplace=True)
+
+    def read_tables_tabula(self):
+        import tabula
+
+        pdopt = {"header": None}
+
+        with warnings.catch_warnings():
+            warnings.simplefilter(action="ignore", category=FutureWarning)
+            return tabula.read_pdf(
+                self.pdf_file, pages="all", lattice=True, pandas_options=pdopt
+            )
+
+    def read_tables_pdfplumber(self):
+        """Read the ruled tables in-process, shaped like tabula's output."""
+        import pandas as pd
+        import pdfplumber
+
+        settings = {
+            "vertical_strategy": "lines",
+            "horizontal_strategy": "lines",
+        }
+
+        tables = []
+        with pdfplumber.open(self.pdf_file) as pdf:
+            for page in pdf.pages:
+                for rows in page.extract_tables(settings):
+                    # tabula keeps line breaks within a cell as \r
+                    rows = [
+                        [
+                            cell.replace("\n", "\r") if cell else None
+                            for cell in row
+                        ]
+                        for row in rows
+                    ]
+                    tables.append(pd.DataFrame(rows))
+        return tables
+
+    def frame(self):
+        """Return every check-in as one DataFrame, oldest first."""
+        import pandas as pd
+
+        columns = ["checkin_time", "club", "address"]
+        frames = [
+            df.dropna(axis=1, how="all").iloc[::-1].set_axis(columns, axis=1)
+            for df in reversed(self.tables)
+        ]
+        return pd.concat(frames, ignore_index=True)
+
+    def start_times(self, checkin_times):
+        """Parse and localize a Series of check-in time strings."""
+        import numpy as np
+        import pandas as pd
+
+        checkin_times = checkin_times.str.replace(r"\s+", " ", regex=True)
+        checkin_times = checkin_times.str.strip()
+
+        # learn the report's date format from its first row
+        self.date_parser.parse(checkin_times.iloc[0])
+        try:
+            naive = pd.to_datetime(
+                checkin_times, format=self.date_parser.format
+            )
+        except (TypeError, ValueError):
+            naive = pd.to_datetime(
+                checkin_times.map(self.date_parser.parse)
+            )
+
+        # ambiguous times resolve to standard time, like pytz localize()
+        return naive.dt.tz_localize(
+            self.timezone_name,
+            ambiguous=np.zeros(len(naive), dtype=bool),
+            nonexistent="shift_forward",
+        )
+
+    def checkins(self):
+        """Return the report's distinct check-ins and their start times.
+
+        Repeated rows and check-ins within min_interval of the previous
+        one are dropped.
+        """
+        df = self.frame()
+        logging.debug("checkins:\n%s", df)
+        self.metrics.count("rows", len(df))
+        if df.empty:
+            return df, df["checkin_time"]
+
+        duplicated = df["checkin_time"].duplicated()
+        self.metrics.count("dropped_duplicate", int(duplicated.sum()))
+        for checkin_time in df.loc[duplicated, "checkin_time"]:
+            print(f"Duplicate {checkin_time=}")
+        df = df[~duplicated].reset_index(drop=True)
+
+        with self.metrics.stage("dates"):
+            start_times = self.start_times(df["checkin_time"])
+
+        seconds = (
+            start_times.dt.tz_convert("UTC")
+            .dt.tz_localize(None)
+            .to_numpy(dtype="datetime64[s]")
+            .astype("int64")
+        )
+        keep, previous = proximity_mask(
+            seconds, self.min_interval.total_seconds()
+        )
+        self.metrics.count("dropped_proximity", int((~keep).sum()))
+        for index in (~keep).nonzero()[0]:
+            print(
+                f"Checkin time {df['checkin_time'][index]} is within 2 hours"
+                f" of {start_times[previous[index]]}"
+            )
+        return df[keep], start_times[keep]
+
+    def events(self, pipeline):
+        df, start_times = self.checkins()
+        if df.empty:
+            return
+
+        # one location string per club, shared by all of its check-ins
+        venues = set(zip(df["club"], df["address"]))
+
+        with self.metrics.stage("geocode"):
+            geocoded = pipeline.geocoder.geocode_many(
+                {address for _, address in venues}
+            )
+        locations = {}
+        for club, address in venues:
+            name = re.sub(r" SS$", " Super Sport", club.replace("\r", " "))
+            locations[club, address] = f"{name}, {geocoded[address]}"
+
+        uids = start_times.dt.strftime("%Y%m%d%I%M%p%Z") + "@CheckinCalendar"
+
+        for uid, checkin_time, start_time, venue in zip(
+            uids,
+            df["checkin_time"],
+            start_times.dt.to_pydatetime(),
+            zip(df["club"], df["address"]),
+        ):
+            location = locations[venue]
+            yield CalendarEvent(
+                uid=uid,
+                summary="Gym Workout",
+                description=f"Gym Workout {checkin_time}",
+                dtstart=start_time,
+                dtend=start_time + self.duration,
+                location=location,
+            )
+
+
+class MergedClubVisitsSource(ClubVisitsSource):
+    """Every check-in merged into a CheckinStore, as one calendar.
+
+    The events match those of the monthly calendars, UIDs included, so
+    a subscriber can move from the monthly files to this single feed.
+    """
+
+    name = "club-visits-merged"
+
+    def __init__(self, store_file=None):
+        self.store_file = store_file
+
+    def load(self):
+        from createics.checkinstore import CheckinStore
+
+        store = CheckinStore(self.store_file)
+        try:
+            self.df = store.frame()
+        finally:
+            store.close()
+
+    def checkins(self):
+        import pandas as pd
+
+        start_times = pd.to_datetime(self.df["start"], unit="s", utc=True)
+        start_times = start_times.dt.tz_convert(self.timezone_name)
+        return self.df, start_times
+
+
+def merge_report(store, source, name=None, mtime=0):
+    """Merge a loaded ClubVisitsSource into store.
+
+    Returns the number of check-ins added.  Check-ins already in the
+    store, or within min_interval of one, are reported and skipped.
+    """
+    import pandas as pd
+
+    df, start_times = source.checkins()
+    rows = []
+    if not df.empty:
+        seconds = (
+            start_times.dt.tz_convert("UTC")
+            .dt.tz_localize(None)
+            .to_numpy(dtype="datetime64[s]")
+            .astype("int64")
+        )
+        rows = zip(seconds, df["checkin_time"], df["club"], df["address"])
+    rejected = store.merge(
+        rows,
+        name or source.pdf_file,
+        mtime,
+        source.min_interval.total_seconds(),
+    )
+    for (start, checkin_time, *_), other in rejected:
+        if start == other:
+            source.metrics.count("dropped_duplicate")
+            print(f"Duplicate {checkin_time=}")
+            continue
+        source.metrics.count("dropped_proximity")
+        stored = pd.Timestamp(other, unit="s", tz="UTC")
+        stored = stored.tz_convert(source.timezone_name)
+        print(f"Checkin time {checkin_time} is within 2 hours of {stored}")
+    return len(df) - len(rejected)
+
+
+def proximity_mask(seconds, min_gap):
+    """Drop check-ins within min_gap seconds of the last kept one.
+
+    Returns a boolean keep mask and, for each dropped check-in, the
+    index of the kept check-in it is too close to.  For a sorted
+    history only the clusters of close check-ins are walked in Python.
+    """
+    import numpy as np
+
+    keep = np.ones(len(seconds), dtype=bool)
+    previous = np.full(len(seconds), -1)
+    if len(seconds) < 2:
+        return keep, previous
+
+    gaps = np.diff(seconds)
+    if (gaps >= 0).all():
+        candidates = (gaps < min_gap).nonzero()[0] + 1
+    else:
+        candidates = range(1, len(seconds))
+
+    last = 0
+    for index in candidates:
+        if keep[index - 1]:
+            last = index - 1
+        if abs(seconds[index] - seconds[last]) < min_gap:
+            keep[index] = False
+            previous[index] = last
+    return keep, previous
+
+
+class GymCheckinsSource(ScheduleSource):
+    """Check-ins exported from the gym app.
+
+    The input is either the app's pdf export, which is OCRed page by
+    page, or text already extracted from it.
+    """
+
+    name = "gym-checkins"
+    product = "rrasch"
+    calendar_name = "GymCalendar"
+    timezone_name = "America/New_York"
+    duration = timedelta(hours=2)
+
+    def __init__(
+        self,
+        checkins_file,
+        year=None,
+        location=None,
+        ocr_workers=None,
+        ocr_cache=True,
+        newest_first=False,
+        today=None,
+    ):
+        self.checkins_file = checkins_file
+        self.year = year
+        self.location = location
+        self.ocr_workers = ocr_workers
+        self.ocr_cache = ocr_cache
+        self.newest_first = newest_first
+        self.today = today
+        self.dates = defaultdict(list)
+
+    @property
+    def prodid(self):
+        return f"-//{self.product}/{self.calendar_name}//EN"
+
+    def load(self):
+        if self.checkins_file.lower().endswith(".pdf"):
+            from createics.ocr import OcrCache, ocr_lines
+
+            # recognized lines are parsed as soon as each page is done
+            self.lines = self.metrics.iterate(
+                "parse",
+                ocr_lines(
+                    self.checkins_file,
+                    self.ocr_workers,
+                    cache=OcrCache() if self.ocr_cache else None,
+                ),
+            )
+            return
+
+        with open(self.checkins_file) as fh:
+            self.lines = list(filter(None, fh.read().splitlines()))
+
+    def multiple_checkins(self):
+        for date, times in self.dates.items():
+            if len(times) > 1:
+                yield date, times
+
+    def checkins(self):
+        """Yield (date, time, start time without a year) per check-in."""
+        line_iter = iter(self.lines)
+        for line in line_iter:
+            date_match = re.search(r"^(\d+/\d+)", line)
+            if not date_match:
+                continue
+
+            date = date_match.group(1)
+            time = next(line_iter)
+            time = re.sub(r"\s*=\s*", "", time)
+            time = re.sub(r":/", ":7", time)
+            time_match = re.search(r"^(\d+):(\d+)([ap]m)", time)
+            if not time_match:
+                raise ValueError(f"Invalid time {date} {time}")
+            hour = time_match.group(1)
+            minutes = int(time_match.group(2))
+            ampm = time_match.group(3)
+            time = f"{hour}:{minutes:02d}{ampm}"
+            self.metrics.count("rows")
+
+            with self.metrics.stage("dates"):
+                start_time = self.start_time(date, time)
+            yield date, time, start_time
+
+    def start_time(self, date, time):
+        return self.date_parser.parse(f"{date}/{PLACEHOLDER_YEAR} {time}")
+
+    def dated_checkins(self):
+        """Yield (date, time, year, naive start time) for each check-in.
+
+        The log runs oldest first, or newest first with newest_first,
+        and its years come from where it crosses into a new year.  The
+        year of the first check-in is either given or chosen so that no
+        check-in is in the future; the latter has to see the whole log
+        before yielding anything.
+        """
+        rollover = YearRollover(descending=self.newest_first)
+        if self.year is not None:
+            first_year = int(self.year)
+            for date, time, start_time in self.checkins():
+                year = first_year + rollover.offset(start_time)
+                yield date, time, year, with_year(start_time, year)
+            return
+
+        rows = [
+            (rollover.offset(start_time), date, time, start_time)
+            for date, time, start_time in self.checkins()
+        ]
+        if not rows:
+            return
+        first_year = log_start_year(
+            [(offset, start_time) for offset, _, _, start_time in rows],
+            self.today or datetime.now(),
+        )
+        for offset, date, time, start_time in rows:
+            year = first_year + offset
+            yield date, time, year, with_year(start_time, year)
+
+    def events(self, pipeline):
+        local_timezone = pipeline.timezone(self.timezone_name)
+
+        for date, time, year, start_time in self.dated_checkins():
+            full_date = f"{date}/{year} {time}"
+            print(full_date)
+
+            self.dates[f"{date}/{year}"].append(time)
+
+            start_time = local_timezone.localize(start_time)
+            end_time = start_time + self.duration
+
+            uid = start_time.strftime("%Y%m%d%I%M%p%Z") + "@MyGymCalendar"
+
+            yield CalendarEvent(
+                uid=uid,
+                summary="Gym Workout",
+                description=f"Gym Workout {full_date}",
+                dtstart=start_time,
+                dtend=end_time,
+                location=self.location,
+            )
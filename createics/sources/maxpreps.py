@@ -0,0 +1,92 @@
+"""Printable MaxPreps team schedule pages."""
+
+from datetime import timedelta
+import re
+
+from dateutil import tz
+
+from createics.model import CalendarEvent
+from createics.sources import HtmlScheduleSource
+
+
+class MaxPrepsSource(HtmlScheduleSource):
+    name = "maxpreps"
+    product = "create-ics"
+    title_suffix = "HS Basketball Game"
+    duration = timedelta(hours=2)
+    keep_tags = ["h1", "address", "table"]
+    fragments = [
+        ('<h1 id="Team_highlight_info1_Header"', "h1"),
+        ("<address", "address"),
+        ('<table id="schedule"', "table"),
+    ]
+
+    def load(self):
+        soup = self.parse_html()
+
+        self.team_name = (
+            soup.find("h1", {"id": "Team_highlight_info1_Header"})
+            .get_text()
+            .split()[0]
+        )
+        self.calendar_name = self.team_name
+        self.home_address = soup.find("address").get_text().strip()
+        self.games = list(
+            self.parse_games(soup.find("table", {"id": "schedule"}).tbody)
+        )
+
+    def parse_games(self, schedule_table):
+        for tr in schedule_table.find_all("tr"):
+            date = tr.find(class_="event-time")["title"]
+            opponent = (
+                tr.find(class_=re.compile(r"contest-type-indicator"))
+                .contents[0]
+                .strip()
+            )
+            opponent_city = (
+                tr.find(class_="contest-city-state").get_text().strip("()")
+            )
+            away = tr.find(class_="away-indicator") is not None
+            location = tr.find(class_="contest-location")["title"]
+            self.metrics.count("rows")
+            yield date, opponent, opponent_city, away, location
+
+    def start_time(self, date):
+        start_time = self.date_parser.parse(date).replace(tzinfo=tz.tzutc())
+        return start_time - timedelta(hours=3)
+
+    def events(self, pipeline):
+        # every distinct venue is looked up once, before any event
+        venues = {
+            f"{location}, {opponent_city}"
+            for _, _, opponent_city, away, location in self.games
+            if away
+        }
+        venues.add(self.home_address)
+        with self.metrics.stage("geocode"):
+            geocoded = pipeline.geocoder.geocode_many(venues)
+
+        for date, opponent, opponent_city, away, location in self.games:
+            if away:
+                title = f"{self.team_name} vs. {opponent}"
+                address = geocoded[f"{location}, {opponent_city}"]
+            else:
+                title = f"{opponent} vs. {self.team_name}"
+                address = geocoded[self.home_address]
+
+            title += f" {self.title_suffix}"
+
+            with self.metrics.stage("dates"):
+                start_time = self.start_time(date)
+            end_time = start_time + self.duration
+
+            uid = re.sub(r"[-:]", "", date) + "@" + self.team_name
+
+            yield CalendarEvent(
+                uid=uid,
+                summary=title,
+                description=title,
+                dtstart=start_time,
+                dtend=end_time,
+                location=f"{location}, {address}",
+            )
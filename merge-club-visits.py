@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+from createics.checkinstore import CheckinStore, default_store_file
+from createics.metrics import add_metrics_arguments, metrics_from_args
+from createics.pipeline import Pipeline, add_event_cache_argument
+from createics.sources.checkins import (
+    ClubVisitsSource,
+    MergedClubVisitsSource,
+    merge_report,
+)
+import argparse
+import logging
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge club visits reports into one checkin calendar.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "pdf_files",
+        nargs="*",
+        metavar="CHECKIN_PDF_FILE",
+        help="pdf files to merge into the checkin store",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="club-visits.ics",
+        help="Consolidated calendar file",
+    )
+    parser.add_argument(
+        "-s",
+        "--store",
+        default=default_store_file(),
+        help="SQLite file holding every merged checkin",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Merge pdf files again even if unchanged since last merged",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Update an existing calendar with new or changed checkins",
+    )
+    parser.add_argument(
+        "--pdf-backend",
+        choices=ClubVisitsSource.backends,
+        default="tabula",
+        help="Library used to extract the checkin table",
+    )
+    parser.add_argument(
+        "-d", "--debug", action="store_true", help="Enable debugging"
+    )
+    add_event_cache_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
+
+    metrics = metrics_from_args(args, "merge-club-visits")
+
+    store = CheckinStore(args.store)
+    try:
+        # report names sort by date, so months are merged in order
+        for pdf_file in sorted(args.pdf_files):
+            name = os.path.basename(pdf_file)
+            mtime = os.path.getmtime(pdf_file)
+            if not args.force and store.is_merged(name, mtime):
+                logging.debug(f"{pdf_file} already merged")
+                continue
+            source = ClubVisitsSource(pdf_file, args.pdf_backend)
+            source.metrics = metrics
+            with metrics.stage("load"):
+                source.load()
+            with metrics.stage("merge"):
+                added = merge_report(store, source, name, mtime)
+            print(f"{pdf_file}: added {added} checkins.")
+        logging.info(f"Store has {len(store)} checkins")
+    finally:
+        store.close()
+
+    source = MergedClubVisitsSource(args.store)
+    pipeline = Pipeline(metrics=metrics, cache_events=args.event_cache)
+    count = pipeline.build(source, args.output, args.incremental)
+
+    print(f"Calendar has {count} checkins.")
+    if args.metrics:
+        metrics.write(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,57 @@
 #!/usr/bin/python3
 
-from bs4 import BeautifulSoup
-from datetime import date, timedelta
-from geopy.geocoders import GoogleV3
-from icalendar import Calendar, Event
-from pathlib import Path
-from pprint import pprint
-from urllib import parse
-import dateutil.parser
-import os
-import pytz
-import re
-
-
-api_key = os.environ.get("MAPS_API_KEY")
-
-geolocator = GoogleV3(api_key=api_key)
-
-script_name = Path(__file__).stem
-
-filename = "index-tidy.html"
-
-soup = BeautifulSoup(open(filename), "html.parser")
-
-schedule_table = soup.find("tbody")
-
-cal = Calendar()
-
-team_name = soup.find("meta",
-    {"property": "og:site_name"})["content"].split()[0]
-
-# Some properties are required to be compliant
-cal.add("prodid", f"-//{script_name}//{team_name}//EN")
-cal.add("version", "2.0")
-
-cols = {
-    0: "day",
-    1: "date",
-    2: "time",
-    3: "location",
-    4: "type",
-    5: "opponent",
-}
-
-local_timezone = pytz.timezone("America/New_York")
-
-today = date.today()
-
-for tr in schedule_table.find_all("tr", recursive=False):
-    td = tr.find_all("td", recursvie=False)
-
-    fields = {}
-    for idx, col_name in cols.items():
-        fields[col_name] = td[idx].get_text().strip()
-
-    if fields["type"] != "Game":
-        continue
-
-    home = fields["location"].startswith("Marc A. Zambetti")
-
-    location = fields["location"]
-
-    if home:
-        title = f"{fields['opponent']} vs. {team_name}"
-    else:
-        title = f"{team_name} vs. {fields['opponent']}"
-        maps_link = td[3].find("a", href=True, text=fields["location"])
-        if maps_link:
-            query = parse.parse_qs(parse.urlsplit(maps_link["href"]).query)
-            location = geolocator.geocode(query["q"][0])
-
-    title += " Boys Varsity Basketball Game"
-
-    date = f"{fields['date']}, {today.year} {fields['time']}"
-
-    start_time = dateutil.parser.parse(date)
-    start_time = local_timezone.localize(start_time)
-    end_time = start_time + timedelta(hours=2)
-
-    uid = start_time.strftime("%Y%m%d%H%M") + "@" + team_name
-
-    event = Event()
-    event.add("summary", title)
-    event.add("description", title)
-    event.add("dtstart", start_time)
-    event.add("dtend", end_time)
-    event.add("location", location)
-    event["uid"] = uid
-    cal.add_component(event)
-
-with open("varsity-schedule.ics", "wb") as fh:
-    fh.write(cal.to_ical())
-
+from createics.metrics import add_metrics_arguments, metrics_from_args
+from createics.pipeline import Pipeline, add_event_cache_argument
+from createics.sources.athletics import VarsitySource
+import argparse
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create calendar from boys varsity schedule page.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "html_file",
+        nargs="?",
+        default="index-tidy.html",
+        help="Input schedule html file",
+    )
+    parser.add_argument(
+        "ics_file",
+        nargs="?",
+        default="varsity-schedule.ics",
+        help="Output calendar ics file",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Only rewrite new, changed or cancelled events of ics_file",
+    )
+    parser.add_argument(
+        "--fast-html",
+        action="store_true",
+        help="Parse only the needed parts of the page with lxml",
+    )
+    parser.add_argument(
+        "-d", "--debug", action="store_true", help="Enable debugging"
+    )
+    add_event_cache_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
+
+    source = VarsitySource(args.html_file, fast_html=args.fast_html)
+    metrics = metrics_from_args(args, "schedule")
+    pipeline = Pipeline(metrics=metrics, cache_events=args.event_cache)
+    pipeline.build(source, args.ics_file, args.incremental)
+    if args.metrics:
+        metrics.write(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    main()
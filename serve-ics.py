@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+from createics.batch import expand_inputs, read_manifest
+from createics.pipeline import add_event_cache_argument
+from createics.server import make_server
+from createics.sources import SOURCES
+import argparse
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve calendars over HTTP, rebuilding them when their"
+        " input files change.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        metavar="INPUT",
+        help="Input files or glob patterns",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        help='File of "SOURCE INPUT [OUTPUT]" lines',
+    )
+    parser.add_argument(
+        "-s",
+        "--source",
+        default="athletics",
+        choices=sorted(SOURCES),
+        help="Source type of the INPUT files",
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="Address to listen on"
+    )
+    parser.add_argument(
+        "-p", "--port", type=int, default=8080, help="Port to listen on"
+    )
+    parser.add_argument(
+        "--fast-html",
+        action="store_true",
+        help="Parse only the needed parts of the page with lxml",
+    )
+    add_event_cache_argument(parser)
+    parser.add_argument(
+        "-d", "--debug", action="store_true", help="Enable debugging"
+    )
+    args = parser.parse_args()
+
+    if not (args.inputs or args.manifest):
+        parser.error("no INPUT files or --manifest given")
+
+    level = logging.DEBUG if args.debug else logging.INFO
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=level)
+
+    jobs = expand_inputs(args.inputs, args.source)
+    if args.manifest:
+        jobs.extend(read_manifest(args.manifest))
+
+    server = make_server(
+        jobs, args.host, args.port, args.fast_html, args.event_cache
+    )
+    for name in sorted(server.feeds):
+        print(f"Serving http://{args.host}:{args.port}/{name}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
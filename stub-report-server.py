@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import secrets
+
+
+PDF_TEMPLATE = (
+    "%PDF-1.4\n"
+    "1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+    "2 0 obj << /Type /Pages /Kids [] /Count 0 >> endobj\n"
+    "% Club Visits {start} - {end}\n"
+    "trailer << /Root 1 0 R >>\n"
+    "%%EOF\n"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Mimics the member site's login and Club Visits report endpoints."""
+
+    sessions = set()
+
+    def send(self, status, body=b"", content_type="text/plain", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def session_id(self):
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == "session":
+                return value
+        return None
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/login":
+            return self.send(404)
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if (
+            form.get("username") != [self.server.username]
+            or form.get("password") != [self.server.password]
+        ):
+            return self.send(401, b"bad credentials")
+        session_id = secrets.token_hex(8)
+        self.sessions.add(session_id)
+        self.send(
+            200,
+            b"ok",
+            headers=[("Set-Cookie", f"session={session_id}; Path=/")],
+        )
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/logout":
+            self.sessions.discard(self.session_id())
+            return self.send(200, b"bye")
+        if url.path != "/report":
+            return self.send(404)
+        if self.session_id() not in self.sessions:
+            return self.send(403, b"login required")
+        query = parse_qs(url.query)
+        if "startDate" not in query or "endDate" not in query:
+            return self.send(400, b"startDate and endDate are required")
+        body = PDF_TEMPLATE.format(
+            start=query["startDate"][0], end=query["endDate"][0]
+        )
+        self.send(200, body.encode(), "application/pdf")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve stand-ins for the club visits report endpoints.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--username", default="member")
+    parser.add_argument("--password", default="secret")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    server.username = args.username
+    server.password = args.password
+
+    print(f"Serving on http://127.0.0.1:{args.port}/")
+    print(f'  login_url = "http://127.0.0.1:{args.port}/login"')
+    print(f'  report_url = "http://127.0.0.1:{args.port}/report"')
+    print(f'  logout_url = "http://127.0.0.1:{args.port}/logout"')
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()